@@ -1,17 +1,28 @@
 """Chunk conversations into user+assistant exchanges for embedding."""
 
-import json
-from dataclasses import dataclass, asdict
+import hashlib
+from array import array
+import mmap
+import os
+import re
+from collections import deque
+from dataclasses import dataclass
+from itertools import chain
 from pathlib import Path
 from typing import Iterator, Literal
 
-from .config import CHUNKS_FILE, PROCESSED_FILE, ensure_dirs, get_all_chunk_files
+from . import _json as json
+from .config import (
+    CHUNK_INDEX_FILE,
+    CHUNKS_FILE,
+    PROCESSED_FILE,
+    ensure_dirs,
+    get_all_chunk_files,
+)
 from .parser import (
     Message,
-    get_conversation_files,
+    get_conversation_entries,
     parse_conversation,
-    extract_files_from_tool_calls,
-    extract_commands_from_tool_calls,
 )
 
 
@@ -25,11 +36,34 @@ CONTEXT_AFTER = 1
 MAX_CHUNK_CHARS = 1400
 OVERLAP_CHARS = 280  # 20% overlap for context continuity
 
+# Chunk text layout: "User: ...\n\nAssistant: ..." per exchange, joined by "---"
+USER_PREFIX = "User: "
+ASSISTANT_SEPARATOR = "\n\nAssistant: "
+EXCHANGE_SEPARATOR = "\n\n---\n\n"
+
 # Separators for recursive splitting, in order of preference
 SEPARATORS = ["\n\n", "\n", ". ", "! ", "? ", " "]
 
+# Parse and chunk files in a process pool when at least this many need work;
+# below this the pool's startup cost outweighs the parallelism
+PARALLEL_MIN_FILES = 8
+
 # Messages to exclude (Claude's automatic initialization, not useful for search)
-EXCLUDED_USER_MESSAGES = {"warmup"}
+EXCLUDED_USER_MESSAGES = frozenset({"warmup"})
+# Lowercasing never shortens a string, so anything longer can't match
+_MAX_EXCLUDED_LEN = max(map(len, EXCLUDED_USER_MESSAGES))
+
+# Matches the "id" field of a serialized chunk without a full JSON parse.
+# Quotes inside string values are always escaped, so this can't match text.
+CHUNK_ID_RE = re.compile(rb'"id"\s*:\s*"([^"\\]*)"')
+
+
+def hard_split(text: str) -> list[str]:
+    """Split text into overlapping MAX_CHUNK_CHARS windows, ignoring boundaries."""
+    return [
+        text[i : i + MAX_CHUNK_CHARS]
+        for i in range(0, len(text), MAX_CHUNK_CHARS - OVERLAP_CHARS)
+    ]
 
 
 def recursive_split(text: str, separators: list[str] | None = None) -> list[str]:
@@ -41,70 +75,101 @@ def recursive_split(text: str, separators: list[str] | None = None) -> list[str]
     if separators is None:
         separators = SEPARATORS
 
+    if not text:
+        return []
     if len(text) <= MAX_CHUNK_CHARS:
         return [text]
 
     # Try each separator in order
-    for sep in separators:
+    for sep_index, sep in enumerate(separators):
         if sep in text:
-            parts = text.split(sep)
+            # Walk separator positions with str.find, tracking the current
+            # chunk as a [start, end) slice of text rather than building it
+            # up by concatenation
             chunks = []
-            current = ""
-
-            for part in parts:
-                candidate = current + sep + part if current else part
-                if len(candidate) <= MAX_CHUNK_CHARS:
-                    current = candidate
+            cur_start = cur_end = 0
+            sep_len = len(sep)
+            pos = 0
+            # rfind only agrees with a left-to-right scan for separators
+            # that can't overlap themselves (e.g. not "\n\n")
+            can_jump = sep[0] not in sep[1:]
+
+            while True:
+                nxt = text.find(sep, pos)
+                part_end = nxt if nxt != -1 else len(text)
+                has_current = cur_end > cur_start
+
+                if part_end - (cur_start if has_current else pos) <= MAX_CHUNK_CHARS:
+                    if not has_current:
+                        cur_start = pos
+                    cur_end = part_end
                 else:
-                    if current:
-                        chunks.append(current)
+                    if has_current:
+                        chunks.append(text[cur_start:cur_end])
                     # If single part exceeds limit, try finer separator
-                    if len(part) > MAX_CHUNK_CHARS:
-                        remaining_seps = separators[separators.index(sep) + 1 :]
-                        if remaining_seps:
+                    if part_end - pos > MAX_CHUNK_CHARS:
+                        part = text[pos:part_end]
+                        # Only descend into separators the part actually
+                        # contains, and only if the part is strictly smaller
+                        # (guarantees progress); otherwise hard split directly
+                        remaining_seps = [s for s in separators[sep_index + 1 :] if s in part]
+                        if remaining_seps and len(part) < len(text):
                             chunks.extend(recursive_split(part, remaining_seps))
                         else:
-                            # Hard split as last resort
-                            chunks.extend(
-                                part[i : i + MAX_CHUNK_CHARS]
-                                for i in range(
-                                    0, len(part), MAX_CHUNK_CHARS - OVERLAP_CHARS
-                                )
-                            )
+                            chunks.extend(hard_split(part))
+                        cur_start = cur_end = part_end
                     else:
-                        current = part
-
-            if current:
-                chunks.append(current)
+                        cur_start, cur_end = pos, part_end
+
+                # Once a chunk is open, jump straight to the last separator
+                # that still fits rather than stepping one part at a time
+                # (the word-level pass would otherwise visit every word)
+                if can_jump and nxt != -1 and cur_end == part_end > cur_start:
+                    limit = cur_start + MAX_CHUNK_CHARS
+                    if len(text) <= limit:
+                        cur_end = len(text)
+                        break
+                    last = text.rfind(sep, nxt + sep_len, limit + sep_len)
+                    if last != -1:
+                        cur_end = nxt = last
+
+                if nxt == -1:
+                    break
+                pos = nxt + sep_len
+
+            if cur_end > cur_start:
+                chunks.append(text[cur_start:cur_end])
 
             return chunks if chunks else [text]
 
     # Last resort: hard split by characters
-    return [
-        text[i : i + MAX_CHUNK_CHARS]
-        for i in range(0, len(text), MAX_CHUNK_CHARS - OVERLAP_CHARS)
-    ]
+    return hard_split(text)
 
 
 def add_overlap(chunks: list[str], overlap: int = OVERLAP_CHARS) -> list[str]:
     """Add overlap between chunks for context continuity.
 
     Prepends the end of the previous chunk to each subsequent chunk,
-    helping preserve context across chunk boundaries.
+    helping preserve context across chunk boundaries. Chunks following one
+    that is no longer than the overlap are left as is.
     """
     if len(chunks) <= 1:
         return chunks
 
     result = [chunks[0]]
-    for i in range(1, len(chunks)):
-        # Prepend end of previous chunk
-        prev_overlap = chunks[i - 1][-overlap:] if len(chunks[i - 1]) > overlap else chunks[i - 1]
-        result.append(prev_overlap + " " + chunks[i])
+    for prev, chunk in zip(chunks, chunks[1:]):
+        # A previous chunk no longer than the overlap would be repeated
+        # whole, adding nothing beyond what that chunk already covers
+        if len(prev) <= overlap:
+            result.append(chunk)
+        else:
+            # Prepend end of previous chunk
+            result.append(f"{prev[-overlap:]} {chunk}")
 
     return result
 
 
-@dataclass
+@dataclass(slots=True)
 class Chunk:
     """A single chunk representing a user+assistant exchange or conversation summary."""
 
@@ -123,6 +188,43 @@ class Chunk:
     files_touched: str = ""  # Comma-separated file paths
     commands_run: str = ""  # Comma-separated commands (truncated)
 
+    def to_dict(self) -> dict:
+        """Convert to a dict for serialization.
+
+        Equivalent to dataclasses.asdict, without its recursive deep copy.
+        """
+        return {
+            "id": self.id,
+            "text": self.text,
+            "timestamp": self.timestamp,
+            "session_id": self.session_id,
+            "chunk_type": self.chunk_type,
+            "turn_index": self.turn_index,
+            "parent_turn_id": self.parent_turn_id,
+            "chunk_index": self.chunk_index,
+            "total_chunks": self.total_chunks,
+            "tools_used": self.tools_used,
+            "files_touched": self.files_touched,
+            "commands_run": self.commands_run,
+        }
+
+    def as_metadata(self) -> dict:
+        """Get the vector store metadata for this chunk (all fields but id and text)."""
+        return {
+            "session_id": self.session_id,
+            "timestamp": self.timestamp,
+            "chunk_type": self.chunk_type,
+            "turn_index": self.turn_index,
+            # Split chunk tracking
+            "parent_turn_id": self.parent_turn_id,
+            "chunk_index": self.chunk_index,
+            "total_chunks": self.total_chunks,
+            # Tool metadata
+            "tools_used": self.tools_used,
+            "files_touched": self.files_touched,
+            "commands_run": self.commands_run,
+        }
+
 
 def create_chunks_with_context(
     exchanges: list[tuple[Message, Message]],
@@ -135,38 +237,48 @@ def create_chunks_with_context(
 
     Returns a list of Chunk objects (usually 1, but may be more for long exchanges).
     """
-    user_msg, assistant_msg = exchanges[current_index]
-    num_exchanges = len(exchanges)
-
-    # Build context from previous exchanges
-    before_parts = []
     start = max(0, current_index - CONTEXT_BEFORE)
-    for j in range(start, current_index):
-        prev_user, prev_asst = exchanges[j]
-        before_parts.append(f"User: {prev_user.content}\n\nAssistant: {prev_asst.content}")
+    end = min(len(exchanges), current_index + CONTEXT_AFTER + 1)
+    return create_turn_chunks(
+        exchanges[start:current_index],
+        exchanges[current_index],
+        exchanges[current_index + 1 : end],
+        current_index,
+    )
 
-    # Current exchange
-    current = f"User: {user_msg.content}\n\nAssistant: {assistant_msg.content}"
 
-    # Build context from following exchanges
-    after_parts = []
-    end = min(num_exchanges, current_index + CONTEXT_AFTER + 1)
-    for j in range(current_index + 1, end):
-        next_user, next_asst = exchanges[j]
-        after_parts.append(f"User: {next_user.content}\n\nAssistant: {next_asst.content}")
+def create_turn_chunks(
+    before: list[tuple[Message, Message]],
+    exchange: tuple[Message, Message],
+    after: list[tuple[Message, Message]],
+    turn_index: int,
+) -> list[Chunk]:
+    """Create chunk(s) for one exchange given its surrounding context exchanges.
 
-    # Combine: [before] --- [current] --- [after]
-    all_parts = before_parts + [current] + after_parts
-    text = "\n\n---\n\n".join(all_parts)
+    See create_chunks_with_context; this form takes the context directly so
+    callers don't need the whole conversation's exchange list in memory.
+    """
+    user_msg, assistant_msg = exchange
+
+    # Combine: [before] --- [current] --- [after], built as one flat list
+    # joined once rather than per-exchange f-strings joined again. The list
+    # is allocated at its final size with separators already in place.
+    num_exchanges = len(before) + 1 + len(after)
+    parts = [EXCHANGE_SEPARATOR] * (5 * num_exchanges - 1)
+    for i, (user, asst) in enumerate(chain(before, (exchange,), after)):
+        base = 5 * i
+        parts[base] = USER_PREFIX
+        parts[base + 1] = user.content
+        parts[base + 2] = ASSISTANT_SEPARATOR
+        parts[base + 3] = asst.content
+    text = "".join(parts)
 
     base_id = assistant_msg.uuid
 
-    # Extract tool metadata from the current turn's assistant message
-    tool_calls = assistant_msg.tool_calls
-    tools_used = ",".join(sorted(set(tc.name for tc in tool_calls))) if tool_calls else ""
-    files_touched = ",".join(sorted(extract_files_from_tool_calls(tool_calls))) if tool_calls else ""
-    commands = extract_commands_from_tool_calls(tool_calls) if tool_calls else []
-    commands_run = ",".join(commands[:5])  # Limit to 5 commands to avoid bloat
+    # Tool metadata from the current turn's assistant message (cached on the message)
+    tools_used = assistant_msg.tools_used
+    files_touched = assistant_msg.files_touched
+    commands_run = assistant_msg.commands_run
 
     # If text fits in one chunk, return single chunk
     if len(text) <= MAX_CHUNK_CHARS:
@@ -177,7 +289,7 @@ def create_chunks_with_context(
                 timestamp=assistant_msg.timestamp,
                 session_id=assistant_msg.session_id,
                 chunk_type="turn",
-                turn_index=current_index,
+                turn_index=turn_index,
                 parent_turn_id="",
                 chunk_index=0,
                 total_chunks=1,
@@ -196,7 +308,7 @@ def create_chunks_with_context(
             timestamp=assistant_msg.timestamp,
             session_id=assistant_msg.session_id,
             chunk_type="turn",
-            turn_index=current_index,
+            turn_index=turn_index,
             parent_turn_id=base_id,  # Track original turn
             chunk_index=i,
             total_chunks=len(parts),
@@ -237,8 +349,10 @@ def create_chunk(user_msg: Message, assistant_msg: Message) -> Chunk:
 
 def is_excluded_message(user_content: str) -> bool:
     """Check if a user message should be excluded from indexing."""
-    normalized = user_content.strip().lower()
-    return normalized in EXCLUDED_USER_MESSAGES
+    # strip() returns the same object when there's nothing to strip, so this
+    # skips lowercasing (and its copy) for all but very short messages
+    stripped = user_content.strip()
+    return len(stripped) <= _MAX_EXCLUDED_LEN and stripped.lower() in EXCLUDED_USER_MESSAGES
 
 
 def chunk_conversation(filepath: Path) -> Iterator[Chunk]:
@@ -247,56 +361,189 @@ def chunk_conversation(filepath: Path) -> Iterator[Chunk]:
     Long exchanges that exceed MAX_CHUNK_CHARS are automatically split into
     multiple chunks with overlap for context continuity.
     """
-    messages = list(parse_conversation(filepath))
+    # Stream exchanges through a sliding window holding just enough context:
+    # an exchange is chunked once CONTEXT_AFTER following exchanges are known
+    window: deque[tuple[Message, Message]] = deque(maxlen=CONTEXT_BEFORE + 1 + CONTEXT_AFTER)
+    count = 0  # Exchanges seen so far
+    next_turn = 0  # Turn index of the next exchange to chunk
+
+    def chunk_turn(turn_index: int) -> list[Chunk]:
+        exchanges = list(window)
+        local = turn_index - (count - len(exchanges))
+        return create_turn_chunks(
+            exchanges[max(0, local - CONTEXT_BEFORE) : local],
+            exchanges[local],
+            exchanges[local + 1 : local + 1 + CONTEXT_AFTER],
+            turn_index,
+        )
 
-    # First pass: collect all exchanges (excluding warmup/init messages)
-    exchanges: list[tuple[Message, Message]] = []
     user_msg = None
-    for msg in messages:
+    for msg in parse_conversation(filepath):
         if msg.role == "user":
             user_msg = msg
         elif msg.role == "assistant" and user_msg is not None:
             # Skip excluded messages like "Warmup"
             if not is_excluded_message(user_msg.content):
-                exchanges.append((user_msg, msg))
+                window.append((user_msg, msg))
+                count += 1
+                if count - 1 - next_turn >= CONTEXT_AFTER:
+                    yield from chunk_turn(next_turn)
+                    next_turn += 1
             user_msg = None
 
-    # Second pass: create chunks with context (may produce multiple chunks per exchange)
-    for i in range(len(exchanges)):
-        yield from create_chunks_with_context(exchanges, i)
+    # Flush exchanges at the end that had fewer than CONTEXT_AFTER followers
+    while next_turn < count:
+        yield from chunk_turn(next_turn)
+        next_turn += 1
+
 
+def _chunk_file(filepath: Path) -> list[Chunk]:
+    """Chunk a single conversation file (process pool entry point)."""
+    return list(chunk_conversation(filepath))
 
-def load_processed() -> dict[str, str]:
-    """Load the set of processed conversation files with their mtimes."""
+
+def load_processed() -> dict[str, int | str]:
+    """Load the set of processed conversation files with their mtimes.
+
+    Mtimes are integer nanoseconds; older versions stored str(st_mtime).
+    """
     if not PROCESSED_FILE.exists():
         return {}
 
     try:
-        with open(PROCESSED_FILE, "r") as f:
-            return json.load(f)
+        with open(PROCESSED_FILE, "rb") as f:
+            return json.loads(f.read())
     except (json.JSONDecodeError, IOError):
         return {}
 
 
-def save_processed(processed: dict[str, str]) -> None:
+def save_processed(processed: dict[str, int | str]) -> None:
     """Save the set of processed conversation files."""
     ensure_dirs()
-    with open(PROCESSED_FILE, "w") as f:
-        json.dump(processed, f, indent=2)
+    with open(PROCESSED_FILE, "wb") as f:
+        f.write(json.dumps(processed, indent=True))
+
+
+def map_chunk_file(chunk_file: Path) -> mmap.mmap | None:
+    """Memory-map a chunks file read-only. Returns None for empty files."""
+    with open(chunk_file, "rb") as f:
+        # mmap can't map an empty file
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def iter_line_spans(mm: mmap.mmap) -> Iterator[tuple[int, int]]:
+    """Yield (start, end) offsets of the non-empty lines in a mapped file."""
+    pos = 0
+    end = len(mm)
+    while pos < end:
+        nl = mm.find(b"\n", pos)
+        if nl == -1:
+            nl = end
+        if nl > pos:
+            yield pos, nl
+        pos = nl + 1
+
+
+def iter_chunk_lines(chunk_file: Path) -> Iterator[bytes]:
+    """Yield the non-empty lines of a chunks file as raw bytes.
+
+    Memory-maps the file and scans for newlines in C, avoiding text-mode
+    decoding and newline translation for every line.
+    """
+    mm = map_chunk_file(chunk_file)
+    if mm is None:
+        return
+    with mm:
+        for start, end in iter_line_spans(mm):
+            yield mm[start:end]
+
+
+def iter_existing_chunk_ids() -> Iterator[bytes]:
+    """Yield the UTF-8 encoded ID of every chunk in any chunks file (all machines)."""
+    for chunk_file in get_all_chunk_files():
+        for line in iter_chunk_lines(chunk_file):
+            # Only the ID is needed, so skip decoding the rest of the line
+            match = CHUNK_ID_RE.search(line)
+            if match:
+                yield match.group(1)
+                continue
+            try:
+                chunk = json.loads(line)
+                yield chunk.get("id", "").encode("utf-8")
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
 
 
 def load_existing_chunk_ids() -> set[str]:
     """Load IDs of chunks already in any chunks file (all machines)."""
-    ids = set()
+    return {chunk_id.decode("utf-8") for chunk_id in iter_existing_chunk_ids()}
+
+
+def chunk_fingerprint(chunk_id: bytes) -> int:
+    """Get a stable 64-bit fingerprint of a UTF-8 encoded chunk ID.
+
+    Collisions are negligible at 2^-64 per pair, so fingerprints can stand
+    in for IDs in membership checks at a fraction of the memory.
+    """
+    return int.from_bytes(hashlib.blake2b(chunk_id, digest_size=8).digest(), "little")
+
+
+def load_existing_chunk_fingerprints() -> set[int]:
+    """Load fingerprints of chunks already in any chunks file (all machines)."""
+    return {chunk_fingerprint(chunk_id) for chunk_id in iter_existing_chunk_ids()}
+
+
+def get_chunk_files_signature() -> dict[str, list[int]]:
+    """Get {filename: [size, mtime_ns]} for all chunk files, to detect changes."""
+    signature = {}
     for chunk_file in get_all_chunk_files():
-        with open(chunk_file, "r") as f:
-            for line in f:
-                try:
-                    chunk = json.loads(line)
-                    ids.add(chunk.get("id", ""))
-                except json.JSONDecodeError:
-                    continue
-    return ids
+        stat = chunk_file.stat()
+        signature[chunk_file.name] = [stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+def load_chunk_index() -> set[int] | None:
+    """Load the persisted chunk fingerprint index.
+
+    The index file is a JSON header line holding the chunk files signature it
+    was built from, followed by the fingerprints as raw 64-bit integers.
+    Returns None if the index is missing, unreadable, or any chunk file has
+    changed since it was written (e.g. after a git pull).
+    """
+    try:
+        with open(CHUNK_INDEX_FILE, "rb") as f:
+            header, _, body = f.read().partition(b"\n")
+        if json.loads(header) != get_chunk_files_signature():
+            return None
+        fingerprints = array("Q")
+        fingerprints.frombytes(body)
+    except (json.JSONDecodeError, ValueError, OSError):
+        return None
+    return set(fingerprints)
+
+
+def save_chunk_index(fingerprints: set[int]) -> None:
+    """Persist the chunk fingerprint index for the current chunk files."""
+    ensure_dirs()
+    tmp = CHUNK_INDEX_FILE.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(json.dumps(get_chunk_files_signature()))
+        f.write(b"\n")
+        f.write(array("Q", fingerprints).tobytes())
+    os.replace(tmp, CHUNK_INDEX_FILE)
+
+
+def count_chunks() -> int:
+    """Count unique chunks across all chunk files without parsing them.
+
+    Uses the persisted index when it is current, otherwise scans chunk IDs.
+    """
+    fingerprints = load_chunk_index()
+    if fingerprints is None:
+        fingerprints = load_existing_chunk_fingerprints()
+    return len(fingerprints)
 
 
 def sync_chunks() -> tuple[int, int]:
@@ -308,38 +555,73 @@ def sync_chunks() -> tuple[int, int]:
     ensure_dirs()
 
     processed = load_processed()
-    existing_ids = load_existing_chunk_ids()
+    # Reuse the persisted index unless chunk files changed since it was saved
+    existing_fps = load_chunk_index()
+    index_stale = existing_fps is None
+    if existing_fps is None:
+        existing_fps = load_existing_chunk_fingerprints()
 
     new_chunks = 0
     new_files = 0
 
-    conversation_files = get_conversation_files()
-
-    for filepath in conversation_files:
-        # Check if file has been modified since last processing
-        mtime = str(filepath.stat().st_mtime)
-        file_key = filepath.name
-
-        if file_key in processed and processed[file_key] == mtime:
-            continue
-
-        # Process this conversation
-        file_had_new = False
-        for chunk in chunk_conversation(filepath):
-            if chunk.id not in existing_ids:
-                # Append to chunks file
-                with open(CHUNKS_FILE, "a") as f:
-                    f.write(json.dumps(asdict(chunk)) + "\n")
-                existing_ids.add(chunk.id)
-                new_chunks += 1
-                file_had_new = True
-
-        if file_had_new:
-            new_files += 1
-
-        # Mark as processed
-        processed[file_key] = mtime
+    def is_unchanged(entry: os.DirEntry) -> bool:
+        prev = processed.get(entry.name)
+        if prev is None:
+            return False
+        stat = entry.stat()
+        return prev == stat.st_mtime_ns or (isinstance(prev, str) and prev == str(stat.st_mtime))
+
+    # Find files modified since last processing (filtered during the scan)
+    to_process = [
+        (Path(entry.path), entry.stat().st_mtime_ns)
+        for entry in get_conversation_entries(skip_if=is_unchanged)
+    ]
 
+    # Parsing and chunking are CPU-bound and independent per file, so fan
+    # them out across processes; writing stays here as the single writer
+    executor = None
+    if len(to_process) >= PARALLEL_MIN_FILES and (os.cpu_count() or 1) > 1:
+        # Imported here: it pulls in multiprocessing, which most runs
+        # (and every other command) never need
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor()
+    paths = [filepath for filepath, _ in to_process]
+
+    # The chunks file is opened on the first new chunk and kept open for the
+    # rest of the run; per-chunk open/close costs a syscall round trip for
+    # every line written. Runs with nothing new never create it
+    out = None
+    try:
+        results = executor.map(_chunk_file, paths, chunksize=8) if executor else map(_chunk_file, paths)
+        for (filepath, mtime), chunks in zip(to_process, results):
+            file_had_new = False
+            for chunk in chunks:
+                fp = chunk_fingerprint(chunk.id.encode("utf-8"))
+                if fp not in existing_fps:
+                    if out is None:
+                        out = open(CHUNKS_FILE, "ab", buffering=1 << 20)
+                    # Two buffered writes avoid copying the payload to append "\n"
+                    out.write(json.dumps(chunk.to_dict()))
+                    out.write(b"\n")
+                    existing_fps.add(fp)
+                    new_chunks += 1
+                    file_had_new = True
+
+            if file_had_new:
+                new_files += 1
+                out.flush()
+
+            # Mark as processed
+            processed[filepath.name] = mtime
+    finally:
+        if out is not None:
+            out.close()
+        if executor:
+            executor.shutdown()
+
+    if index_stale or new_chunks:
+        save_chunk_index(existing_fps)
     save_processed(processed)
     return new_chunks, new_files
 
@@ -347,42 +629,86 @@ def sync_chunks() -> tuple[int, int]:
 def load_all_chunks() -> list[Chunk]:
     """Load all chunks from all chunk files (all machines), deduplicating by ID.
 
+    See iter_all_chunks.
+    """
+    return list(iter_all_chunks())
+
+
+def iter_all_chunks(exclude: set[str] | None = None) -> Iterator[Chunk]:
+    """Yield all chunks from all chunk files (all machines), deduplicating by ID.
+
     Reads from both legacy chunks.jsonl and machine-specific chunks-*.jsonl files.
     If the same chunk ID appears multiple times (e.g., from a git merge),
-    the last occurrence is kept. This makes the system robust to duplicate
+    the last valid occurrence is kept. This makes the system robust to duplicate
     entries from multi-machine sync conflicts.
 
     Handles both old format (without chunk_type/turn_index/split fields) and new format.
+    Chunks are parsed as they are consumed, so callers that stream them (e.g.
+    into an index) never hold every chunk in memory at once.
+
+    Args:
+        exclude: Chunk IDs to skip (e.g. already indexed). Their lines are
+            never parsed, so an incremental index update only pays for new chunks.
     """
     chunk_files = get_all_chunk_files()
     if not chunk_files:
-        return []
+        return
 
-    # Use dict to deduplicate by ID, keeping last occurrence
-    chunks_by_id: dict[str, Chunk] = {}
-    for chunk_file in chunk_files:
-        with open(chunk_file, "r") as f:
-            for line in f:
+    # First pass: collect each ID's lines without parsing the rest of the
+    # line. Dict order stays first-occurrence order.
+    maps = [map_chunk_file(chunk_file) for chunk_file in chunk_files]
+    try:
+        spans: dict[str, list[tuple[int, int, int]]] = {}
+        for file_idx, mm in enumerate(maps):
+            if mm is None:
+                continue
+            for start, end in iter_line_spans(mm):
                 try:
-                    data = json.loads(line)
-                    chunk = Chunk(
-                        id=data["id"],
-                        text=data["text"],
-                        timestamp=data["timestamp"],
-                        session_id=data["session_id"],
-                        # Fields with defaults for backwards compatibility
-                        chunk_type=data.get("chunk_type", "turn"),
-                        turn_index=data.get("turn_index", 0),
-                        # Split-tracking fields
-                        parent_turn_id=data.get("parent_turn_id", ""),
-                        chunk_index=data.get("chunk_index", 0),
-                        total_chunks=data.get("total_chunks", 1),
-                        # Tool metadata fields (new)
-                        tools_used=data.get("tools_used", ""),
-                        files_touched=data.get("files_touched", ""),
-                        commands_run=data.get("commands_run", ""),
-                    )
-                    chunks_by_id[chunk.id] = chunk
-                except (json.JSONDecodeError, KeyError):
+                    match = CHUNK_ID_RE.search(mm, start, end)
+                    if match:
+                        chunk_id = match.group(1).decode("utf-8")
+                    else:
+                        chunk_id = json.loads(mm[start:end])["id"]
+                except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError):
                     continue
-    return list(chunks_by_id.values())
+                spans.setdefault(chunk_id, []).append((file_idx, start, end))
+
+        # Second pass: parse each wanted ID's last line, falling back to
+        # earlier ones if it is malformed (e.g. a truncated append)
+        for chunk_id, id_spans in spans.items():
+            if exclude and chunk_id in exclude:
+                continue
+            for file_idx, start, end in reversed(id_spans):
+                chunk = _parse_chunk_line(maps[file_idx][start:end])
+                if chunk is not None:
+                    yield chunk
+                    break
+    finally:
+        for mm in maps:
+            if mm is not None:
+                mm.close()
+
+
+def _parse_chunk_line(line: bytes) -> Chunk | None:
+    """Parse one chunks.jsonl line, or return None if it is malformed."""
+    try:
+        data = json.loads(line)
+        return Chunk(
+            id=data["id"],
+            text=data["text"],
+            timestamp=data["timestamp"],
+            session_id=data["session_id"],
+            # Fields with defaults for backwards compatibility
+            chunk_type=data.get("chunk_type", "turn"),
+            turn_index=data.get("turn_index", 0),
+            # Split-tracking fields
+            parent_turn_id=data.get("parent_turn_id", ""),
+            chunk_index=data.get("chunk_index", 0),
+            total_chunks=data.get("total_chunks", 1),
+            # Tool metadata fields (new)
+            tools_used=data.get("tools_used", ""),
+            files_touched=data.get("files_touched", ""),
+            commands_run=data.get("commands_run", ""),
+        )
+    except (json.JSONDecodeError, UnicodeDecodeError, KeyError):
+        return None
@@ -2,20 +2,19 @@
 
 import click
 
-from .chunker import sync_chunks, load_all_chunks
-from .store import Store, get_indexed_count
+from .chunker import count_chunks, iter_all_chunks, sync_chunks
 from .text_index import TextIndex
 from .summarizer import sync_summaries, is_ollama_available, DEFAULT_MODEL
 from .parser import get_context_around
 from .config import (
     CHUNKS_FILE,
     CHROMA_DIR,
-    PROJECT_DIR,
     STORAGE_DIR,
     COLLECTION_NAME,
     EMBEDDING_MODEL,
     get_machine_id,
     get_all_chunk_files,
+    get_project_dirs,
 )
 
 
@@ -51,15 +50,25 @@ def sync(quiet: bool, no_summaries: bool):
         if generated > 0:
             log(f"  Generated {generated} summaries")
 
+    # Imported where needed: the store module loads ChromaDB, which is slow
+    # to import, so commands that don't touch the index (e.g. config) skip it
+    from .store import Store, get_indexed_count
+
     # Early exit: skip embedding model load if no work to do
     if new_chunks == 0:
-        # Quick check if index is already in sync (without loading embedding model)
-        chunks = load_all_chunks()
+        # Quick check if index is already in sync (without loading embedding
+        # model or parsing chunk files)
+        total = count_chunks()
         indexed_count = get_indexed_count()
-        if len(chunks) == indexed_count:
+        if total == indexed_count:
             log(f"Index up to date ({indexed_count} chunks)")
             return
-        log(f"  Index out of sync ({len(chunks)} chunks, {indexed_count} indexed)")
+        log(f"  Index out of sync ({total} chunks, {indexed_count} indexed)")
+
+    # rebuild_index also adds new chunks to the text index, so its size is
+    # taken first to report what keyword search gained
+    text_index = TextIndex()
+    text_count_before = text_index.count()
 
     # Only load embedding model if we have work to do
     log("Updating vector index...")
@@ -70,13 +79,16 @@ def sync(quiet: bool, no_summaries: bool):
     else:
         log("  Vector index up to date")
 
-    # Update text index for hybrid search (BM25)
+    # Update text index for hybrid search (BM25). rebuild_index already
+    # indexed the new chunks; this catches up anything else the text index
+    # is missing (e.g. if its database was removed). add_batch skips
+    # already-indexed chunks in SQL, so the chunks are streamed straight in
     log("Updating text index...")
-    chunks = load_all_chunks()
-    text_index = TextIndex()
-    text_indexed = text_index.add_batch([
-        (c.id, c.text, c.session_id, c.timestamp) for c in chunks
-    ])
+    if text_index.count() != count_chunks():
+        text_index.add_batch(
+            (c.id, c.text, c.session_id, c.timestamp) for c in iter_all_chunks()
+        )
+    text_indexed = text_index.count() - text_count_before
     if text_indexed > 0:
         log(f"  Indexed {text_indexed} chunks for keyword search")
     else:
@@ -91,6 +103,8 @@ def sync(quiet: bool, no_summaries: bool):
 @click.option("-c", "--context", default=1, help="Turns before/after each result (default: 1)")
 def search(query: str, num_results: int, context: int):
     """Search conversations for relevant context."""
+    from .store import Store
+
     store = Store()
 
     if store.count() == 0:
@@ -104,19 +118,21 @@ def search(query: str, num_results: int, context: int):
         return
 
     for i, result in enumerate(results, 1):
-        click.echo(f"\n{'='*60}")
+        # Collect each result's output and write it with a single echo;
+        # context can run to hundreds of lines per result
+        lines = [f"\n{'='*60}"]
         type_label = "📝 Summary" if result.chunk_type == "summary" else f"💬 Turn {result.turn_index + 1}"
-        click.echo(f"Result {i} [{type_label}] (distance: {result.distance:.4f})")
-        click.echo(f"Session: {result.session_id}")
-        click.echo(f"Time: {result.timestamp}")
+        lines.append(f"Result {i} [{type_label}] (distance: {result.distance:.4f})")
+        lines.append(f"Session: {result.session_id}")
+        lines.append(f"Time: {result.timestamp}")
 
         # Show tool metadata if present
         if result.tools_used:
-            click.echo(f"Tools: {result.tools_used}")
+            lines.append(f"Tools: {result.tools_used}")
         if result.files_touched:
-            click.echo(f"Files: {result.files_touched}")
+            lines.append(f"Files: {result.files_touched}")
 
-        click.echo(f"{'='*60}")
+        lines.append(f"{'='*60}")
 
         # Show context if requested
         if context > 0:
@@ -127,47 +143,57 @@ def search(query: str, num_results: int, context: int):
                     # Highlight the matched turn
                     is_match = msg.timestamp == result.timestamp
                     marker = ">>>" if is_match else "   "
-                    click.echo(f"\n{marker} [{role_label}] {msg.timestamp}")
-                    click.echo(f"    {'-'*40}")
+                    lines.append(f"\n{marker} [{role_label}] {msg.timestamp}")
+                    lines.append(f"    {'-'*40}")
 
                     # Show text content (truncated)
                     if msg.content:
                         content = msg.content
                         if len(content) > 500 and not is_match:
                             content = content[:500] + "..."
-                        for line in content.split('\n'):
-                            click.echo(f"    {line}")
+                        lines.extend(f"    {line}" for line in content.split('\n'))
 
                     # Show tool calls
-                    if msg.tool_calls:
-                        for tc in msg.tool_calls:
-                            click.echo(f"    🔧 {tc.name}", nl=False)
-                            if "file_path" in tc.input:
-                                click.echo(f" → {tc.input['file_path']}")
-                            elif "command" in tc.input:
-                                cmd = tc.input['command'][:60] + "..." if len(tc.input['command']) > 60 else tc.input['command']
-                                click.echo(f" → {cmd}")
-                            else:
-                                click.echo()
+                    for tc in msg.tool_calls:
+                        if "file_path" in tc.input:
+                            lines.append(f"    🔧 {tc.name} → {tc.input['file_path']}")
+                        elif "command" in tc.input:
+                            cmd = tc.input['command'][:60] + "..." if len(tc.input['command']) > 60 else tc.input['command']
+                            lines.append(f"    🔧 {tc.name} → {cmd}")
+                        else:
+                            lines.append(f"    🔧 {tc.name}")
             else:
                 # Original conversation file not found (deleted or moved)
-                click.echo("(Context unavailable - original conversation not found)")
-                click.echo(result.text)
+                lines.append("(Context unavailable - original conversation not found)")
+                lines.append(result.text)
         else:
             # Just show the matched chunk text
-            click.echo(result.text)
+            lines.append(result.text)
+
+        click.echo("\n".join(lines))
 
 
 @cli.command()
 def stats():
     """Show index statistics."""
-    store = Store()
-    chunks = load_all_chunks()
+    # Loads ChromaDB for the count, but not the embedding model
+    from .store import get_indexed_count
+
     chunk_files = get_all_chunk_files()
 
-    # Count by type
-    turn_chunks = [c for c in chunks if c.chunk_type == "turn"]
-    summary_chunks = [c for c in chunks if c.chunk_type == "summary"]
+    # Count by type and session in one pass, streaming chunks rather than
+    # holding them all
+    total_chunks = 0
+    turn_chunks = 0
+    summary_chunks = 0
+    sessions = set()
+    for c in iter_all_chunks():
+        total_chunks += 1
+        sessions.add(c.session_id)
+        if c.chunk_type == "turn":
+            turn_chunks += 1
+        elif c.chunk_type == "summary":
+            summary_chunks += 1
 
     click.echo(f"Machine ID: {get_machine_id()}")
     click.echo(f"Writing to: {CHUNKS_FILE}")
@@ -175,22 +201,24 @@ def stats():
     for f in chunk_files:
         click.echo(f"  - {f.name}")
     click.echo(f"ChromaDB dir: {CHROMA_DIR}")
-    click.echo(f"Total chunks in files: {len(chunks)}")
-    click.echo(f"  Turn chunks: {len(turn_chunks)}")
-    click.echo(f"  Summary chunks: {len(summary_chunks)}")
-    click.echo(f"Total chunks indexed: {store.count()}")
+    click.echo(f"Total chunks in files: {total_chunks}")
+    click.echo(f"  Turn chunks: {turn_chunks}")
+    click.echo(f"  Summary chunks: {summary_chunks}")
+    # Count without loading the embedding model
+    click.echo(f"Total chunks indexed: {get_indexed_count()}")
 
-    if chunks:
-        sessions = set(c.session_id for c in chunks)
+    if total_chunks:
         click.echo(f"Unique conversations: {len(sessions)}")
         if summary_chunks:
-            coverage = len(summary_chunks) / len(sessions) * 100
+            coverage = summary_chunks / len(sessions) * 100
             click.echo(f"Summary coverage: {coverage:.1f}%")
 
 
 @cli.command()
 def rebuild():
     """Force rebuild the index from chunks.jsonl."""
+    from .store import Store
+
     click.echo("Clearing existing index...")
     store = Store()
     store.clear()
@@ -220,6 +248,8 @@ def summarize(model: str, quiet: bool):
 
         # Update index with new summaries
         click.echo("Updating index...")
+        from .store import Store
+
         store = Store()
         indexed = store.rebuild_index()
         click.echo(f"Indexed {indexed} new chunks")
@@ -235,8 +265,12 @@ def config():
     click.echo("Claude Memory Configuration")
     click.echo("=" * 50)
     click.echo(f"Machine ID:      {get_machine_id()}")
-    click.echo(f"Project dir:     {PROJECT_DIR}")
-    click.echo(f"  exists:        {PROJECT_DIR.exists()}")
+    project_dirs = get_project_dirs()
+    if project_dirs:
+        click.echo(f"Project dir:     {project_dirs[0]}")
+        click.echo(f"  exists:        {project_dirs[0].exists()}")
+    else:
+        click.echo("Project dir:     (none found)")
     click.echo(f"Storage dir:     {STORAGE_DIR}")
     click.echo(f"  exists:        {STORAGE_DIR.exists()}")
     click.echo(f"Chunks file:     {CHUNKS_FILE}")
@@ -250,11 +284,12 @@ def config():
     click.echo(f"Embedding model: {EMBEDDING_MODEL}")
     click.echo()
     click.echo("Environment variables:")
-    click.echo("  CLAUDE_MEMORY_PROJECT    - Claude project directory to index")
-    click.echo("  CLAUDE_MEMORY_STORAGE    - Storage directory (git-sync this)")
-    click.echo("  CLAUDE_MEMORY_MACHINE_ID - Machine identifier (default: hostname)")
-    click.echo("  CLAUDE_MEMORY_COLLECTION - ChromaDB collection name")
-    click.echo("  CLAUDE_MEMORY_MODEL      - Embedding model name")
+    click.echo("  CLAUDE_MEMORY_PROJECT      - Claude project directory to index")
+    click.echo("  CLAUDE_MEMORY_STORAGE      - Storage directory (git-sync this)")
+    click.echo("  CLAUDE_MEMORY_MACHINE_ID   - Machine identifier (default: hostname)")
+    click.echo("  CLAUDE_MEMORY_COLLECTION   - ChromaDB collection name")
+    click.echo("  CLAUDE_MEMORY_MODEL        - Embedding model name")
+    click.echo("  CLAUDE_MEMORY_INSERT_BATCH - Chunks per index insert (default: 1000)")
 
 
 if __name__ == "__main__":
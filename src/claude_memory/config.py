@@ -2,11 +2,15 @@
 
 import os
 import socket
+from functools import lru_cache
 from pathlib import Path
 
 # Claude Code projects directory
 CLAUDE_PROJECTS = Path.home() / ".claude" / "projects"
 
+# Largest batch ChromaDB accepts in a single add
+CHROMA_MAX_BATCH_SIZE = 5461
+
 
 def get_project_dirs() -> list[Path]:
     """Get the Claude project directories to index.
@@ -55,6 +59,21 @@ def get_collection_name() -> str:
     return os.environ.get("CLAUDE_MEMORY_COLLECTION", "conversations")
 
 
+def get_insert_batch_size() -> int:
+    """Get the number of chunks to embed and insert per ChromaDB add.
+
+    Set CLAUDE_MEMORY_INSERT_BATCH to override. Smaller batches keep peak
+    memory down during the embedding pass; the value is capped at ChromaDB's
+    maximum batch size. Invalid values fall back to the default, since this
+    is read at import time by every command.
+    """
+    try:
+        size = int(os.environ.get("CLAUDE_MEMORY_INSERT_BATCH", "1000"))
+    except ValueError:
+        size = 1000
+    return max(1, min(size, CHROMA_MAX_BATCH_SIZE))
+
+
 def get_machine_id() -> str:
     """Get the machine identifier for this host.
 
@@ -65,7 +84,16 @@ def get_machine_id() -> str:
     """
     if env_id := os.environ.get("CLAUDE_MEMORY_MACHINE_ID"):
         return env_id
+    return _hostname_machine_id()
 
+
+@lru_cache(maxsize=1)
+def _hostname_machine_id() -> str:
+    """Get the sanitized hostname, looked up once per process.
+
+    gethostname can be slow on some systems; the environment override in
+    get_machine_id is still checked on every call.
+    """
     # Use hostname, sanitized for filename safety
     hostname = socket.gethostname()
     # Remove domain suffix and sanitize
@@ -100,18 +128,27 @@ def get_all_chunk_files() -> list[Path]:
     return files
 
 
-# Resolved paths
-PROJECT_DIR = get_project_dir()
+# Resolved paths (PROJECT_DIR is resolved on access, see __getattr__)
 STORAGE_DIR = get_storage_dir()
 CHUNKS_FILE = get_chunks_file()
 CHROMA_DIR = STORAGE_DIR / "chroma"
 PROCESSED_FILE = STORAGE_DIR / "processed.json"
+CHUNK_INDEX_FILE = STORAGE_DIR / "chunk_index.bin"
 COLLECTION_NAME = get_collection_name()
+INSERT_BATCH_SIZE = get_insert_batch_size()
 
 # Embedding model (all-mpnet-base-v2 is recommended for quality)
 EMBEDDING_MODEL = os.environ.get("CLAUDE_MEMORY_MODEL", "all-mpnet-base-v2")
 
 
+def __getattr__(name: str):
+    # Resolving PROJECT_DIR lists and stats every project directory (and
+    # raises if there are none), so only pay for it when it's asked for
+    if name == "PROJECT_DIR":
+        return get_project_dir()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def ensure_dirs():
     """Create necessary directories if they don't exist."""
     STORAGE_DIR.mkdir(parents=True, exist_ok=True)
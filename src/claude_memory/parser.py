@@ -1,15 +1,25 @@
 """Parse Claude Code conversation JSONL files."""
 
-import json
+import os
 import re
+from bisect import bisect_left
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterator
+from typing import Callable, Iterator
 
+from . import _json as json
 from .config import get_project_dirs
 
 
-@dataclass
+# Limit commands recorded per message to avoid bloating chunk metadata
+MAX_COMMANDS_PER_MESSAGE = 5
+
+# Quoted paths with a short extension in Bash commands, e.g. "src/app.py"
+BASH_PATH_RE = re.compile(r'["\']([^"\']+\.[a-z]{1,4})["\']')
+
+
+@dataclass(slots=True)
 class ToolCall:
     """A tool call from an assistant message."""
 
@@ -18,7 +28,7 @@ class ToolCall:
     id: str = ""  # Tool use ID for matching with results
 
 
-@dataclass
+@dataclass(slots=True)
 class ToolResult:
     """A tool result from a user message."""
 
@@ -27,7 +37,7 @@ class ToolResult:
     is_error: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     """A single message from a conversation."""
 
@@ -39,6 +49,36 @@ class Message:
     tool_calls: list[ToolCall] = field(default_factory=list)
     tool_results: list[ToolResult] = field(default_factory=list)
 
+    # Tool metadata strings, computed on first access and reused for every
+    # chunk the message's turn produces. Plain slots rather than
+    # cached_property, which would need a per-instance __dict__.
+    _tools_used: str | None = field(default=None, init=False, repr=False, compare=False)
+    _files_touched: str | None = field(default=None, init=False, repr=False, compare=False)
+    _commands_run: str | None = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def tools_used(self) -> str:
+        """Comma-separated, sorted, unique tool names."""
+        if self._tools_used is None:
+            self._tools_used = ",".join(sorted({tc.name for tc in self.tool_calls}))
+        return self._tools_used
+
+    @property
+    def files_touched(self) -> str:
+        """Comma-separated, sorted file paths referenced by tool calls."""
+        if self._files_touched is None:
+            self._files_touched = ",".join(sorted(extract_files_from_tool_calls(self.tool_calls)))
+        return self._files_touched
+
+    @property
+    def commands_run(self) -> str:
+        """Comma-separated Bash commands (truncated, at most MAX_COMMANDS_PER_MESSAGE)."""
+        if self._commands_run is None:
+            self._commands_run = ",".join(
+                extract_commands_from_tool_calls(self.tool_calls)[:MAX_COMMANDS_PER_MESSAGE]
+            )
+        return self._commands_run
+
 
 def extract_text_content(message_data: dict) -> str | None:
     """Extract text content from a message, handling both user and assistant formats."""
@@ -54,10 +94,11 @@ def extract_text_content(message_data: dict) -> str | None:
 
     # Assistant messages: content is an array of blocks
     if isinstance(content, list):
-        text_parts = []
-        for block in content:
-            if isinstance(block, dict) and block.get("type") == "text":
-                text_parts.append(block.get("text", ""))
+        text_parts = [
+            block.get("text", "")
+            for block in content
+            if isinstance(block, dict) and block.get("type") == "text"
+        ]
         return "\n".join(text_parts) if text_parts else None
 
     return None
@@ -74,13 +115,7 @@ def extract_tool_calls(message_data: dict) -> list[ToolCall]:
     tool_calls = []
     for block in content:
         if isinstance(block, dict) and block.get("type") == "tool_use":
-            tool_calls.append(
-                ToolCall(
-                    name=block.get("name", ""),
-                    input=block.get("input", {}),
-                    id=block.get("id", ""),
-                )
-            )
+            tool_calls.append(_tool_call_from_block(block))
     return tool_calls
 
 
@@ -95,26 +130,75 @@ def extract_tool_results(message_data: dict) -> list[ToolResult]:
     results = []
     for block in content:
         if isinstance(block, dict) and block.get("type") == "tool_result":
-            # Content can be string or list of content blocks
-            result_content = block.get("content", "")
-            if isinstance(result_content, list):
-                # Extract text from content blocks
-                text_parts = []
-                for part in result_content:
-                    if isinstance(part, dict) and part.get("type") == "text":
-                        text_parts.append(part.get("text", ""))
-                result_content = "\n".join(text_parts)
-
-            results.append(
-                ToolResult(
-                    tool_use_id=block.get("tool_use_id", ""),
-                    content=str(result_content) if result_content else "",
-                    is_error=block.get("is_error", False),
-                )
-            )
+            results.append(_tool_result_from_block(block))
     return results
 
 
+def _tool_call_from_block(block: dict) -> ToolCall:
+    """Build a ToolCall from a tool_use content block."""
+    return ToolCall(
+        name=block.get("name", ""),
+        input=block.get("input", {}),
+        id=block.get("id", ""),
+    )
+
+
+def _tool_result_from_block(block: dict) -> ToolResult:
+    """Build a ToolResult from a tool_result content block."""
+    # Content can be string or list of content blocks
+    result_content = block.get("content", "")
+    if isinstance(result_content, list):
+        # Extract text from content blocks
+        text_parts = []
+        for part in result_content:
+            if isinstance(part, dict) and part.get("type") == "text":
+                text_parts.append(part.get("text", ""))
+        result_content = "\n".join(text_parts)
+
+    return ToolResult(
+        tool_use_id=block.get("tool_use_id", ""),
+        content=str(result_content) if result_content else "",
+        is_error=block.get("is_error", False),
+    )
+
+
+def extract_message_parts(
+    message_data: dict, role: str
+) -> tuple[str | None, list[ToolCall], list[ToolResult]]:
+    """Extract text, tool calls, and tool results in one pass over the content.
+
+    Same results as extract_text_content plus extract_tool_calls (assistant
+    messages only) and extract_tool_results (user messages only), which
+    would each walk the content blocks separately.
+    """
+    content = message_data.get("message", {}).get("content")
+
+    # User messages: content is a string
+    if isinstance(content, str):
+        return content, [], []
+    if not isinstance(content, list):
+        return None, [], []
+
+    text_parts = []
+    tool_calls = []
+    tool_results = []
+    for block in content:
+        if not isinstance(block, dict):
+            continue
+        block_type = block.get("type")
+        if block_type == "text":
+            text_parts.append(block.get("text", ""))
+        elif block_type == "tool_use":
+            if role == "assistant":
+                tool_calls.append(_tool_call_from_block(block))
+        elif block_type == "tool_result":
+            if role == "user":
+                tool_results.append(_tool_result_from_block(block))
+
+    text = "\n".join(text_parts) if text_parts else None
+    return text, tool_calls, tool_results
+
+
 def extract_files_from_tool_calls(tool_calls: list[ToolCall]) -> set[str]:
     """Extract file paths from tool calls."""
     files = set()
@@ -129,9 +213,10 @@ def extract_files_from_tool_calls(tool_calls: list[ToolCall]) -> set[str]:
         if tc.name == "Bash" and "command" in tc.input:
             cmd = tc.input["command"]
             # Simple heuristic: find quoted paths or common file extensions
-            # This is imperfect but catches many cases
-            path_patterns = re.findall(r'["\']([^"\']+\.[a-z]{1,4})["\']', cmd)
-            files.update(path_patterns)
+            # This is imperfect but catches many cases. A match needs a dot,
+            # so commands without one skip the regex entirely.
+            if "." in cmd:
+                files.update(BASH_PATH_RE.findall(cmd))
     return files
 
 
@@ -158,7 +243,11 @@ def parse_conversation(filepath: Path, include_tool_only: bool = False) -> Itera
     """
     session_id = filepath.stem
 
-    with open(filepath, "r", encoding="utf-8") as f:
+    # Read bytes and let the decoder handle UTF-8, skipping a separate
+    # decode pass per line (and tolerating lines with invalid UTF-8). A
+    # 64 KiB buffer halves line-splitting time on large files compared with
+    # the default, without a big allocation for every small one
+    with open(filepath, "rb", buffering=1 << 16) as f:
         for line in f:
             line = line.strip()
             if not line:
@@ -166,7 +255,7 @@ def parse_conversation(filepath: Path, include_tool_only: bool = False) -> Itera
 
             try:
                 data = json.loads(line)
-            except json.JSONDecodeError:
+            except (json.JSONDecodeError, UnicodeDecodeError):
                 continue
 
             # Skip non-message types
@@ -184,9 +273,7 @@ def parse_conversation(filepath: Path, include_tool_only: bool = False) -> Itera
                 continue
 
             # Extract content and tools
-            content = extract_text_content(data)
-            tool_calls = extract_tool_calls(data) if role == "assistant" else []
-            tool_results = extract_tool_results(data) if role == "user" else []
+            content, tool_calls, tool_results = extract_message_parts(data, role)
 
             # Skip if no content and no tools (unless include_tool_only)
             has_content = content and content.strip()
@@ -208,13 +295,41 @@ def parse_conversation(filepath: Path, include_tool_only: bool = False) -> Itera
             )
 
 
+def iter_conversation_entries(
+    skip_if: Callable[[os.DirEntry], bool] | None = None,
+) -> Iterator[os.DirEntry]:
+    """Yield directory entries for JSONL conversation files in all project directories.
+
+    Args:
+        skip_if: Optional predicate; entries for which it returns True are dropped.
+    """
+    for project_dir in get_project_dirs():
+        if not project_dir.exists():
+            continue
+        with os.scandir(project_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".jsonl") or not entry.is_file():
+                    continue
+                if skip_if is not None and skip_if(entry):
+                    continue
+                yield entry
+
+
 def get_conversation_files() -> list[Path]:
     """Get all JSONL conversation files from all project directories."""
-    files = []
-    for project_dir in get_project_dirs():
-        if project_dir.exists():
-            files.extend(project_dir.glob("*.jsonl"))
-    return sorted(files)
+    return sorted(Path(entry.path) for entry in iter_conversation_entries())
+
+
+def get_conversation_entries(
+    skip_if: Callable[[os.DirEntry], bool] | None = None,
+) -> list[os.DirEntry]:
+    """Get directory entries for JSONL conversation files, sorted by path.
+
+    DirEntry caches its stat result, so callers can check names and mtimes
+    for many files without building Path objects or re-stat-ing. Pass
+    skip_if to drop entries (e.g. unchanged files) during the scan.
+    """
+    return sorted(iter_conversation_entries(skip_if), key=lambda entry: entry.path)
 
 
 def parse_all_conversations() -> Iterator[Message]:
@@ -235,6 +350,29 @@ def find_conversation_file(session_id: str) -> Path | None:
     return None
 
 
+@lru_cache(maxsize=16)
+def _parse_conversation_cached(filepath: Path, mtime_ns: int) -> tuple[Message, ...]:
+    """Parse a conversation once per (path, mtime).
+
+    Search results often share a session, and each one asks for context;
+    keying on mtime means an appended-to file is parsed again.
+    """
+    return tuple(parse_conversation(filepath, include_tool_only=False))
+
+
+@lru_cache(maxsize=16)
+def _sorted_timestamps(filepath: Path, mtime_ns: int) -> list[str] | None:
+    """Get a cached conversation's message timestamps if they are in order.
+
+    Returns None when they aren't (e.g. out-of-order entries), in which case
+    a binary search could pick a different message than a scan would.
+    """
+    timestamps = [msg.timestamp for msg in _parse_conversation_cached(filepath, mtime_ns)]
+    if all(a <= b for a, b in zip(timestamps, timestamps[1:])):
+        return timestamps
+    return None
+
+
 def get_context_around(session_id: str, timestamp: str, n: int = 2) -> list[Message]:
     """Get N messages before and after a specific timestamp in a conversation.
 
@@ -250,23 +388,34 @@ def get_context_around(session_id: str, timestamp: str, n: int = 2) -> list[Mess
     if not filepath:
         return []
 
-    messages = list(parse_conversation(filepath, include_tool_only=False))
+    try:
+        mtime_ns = filepath.stat().st_mtime_ns
+    except FileNotFoundError:
+        return []
+    messages = _parse_conversation_cached(filepath, mtime_ns)
     if not messages:
         return []
 
-    # Find the message matching the timestamp
+    # Find the (first) message matching the timestamp, by binary search when
+    # timestamps are in order and by a linear scan otherwise
     target_idx = None
-    for i, msg in enumerate(messages):
-        if msg.timestamp == timestamp:
+    timestamps = _sorted_timestamps(filepath, mtime_ns)
+    if timestamps is not None:
+        i = bisect_left(timestamps, timestamp)
+        if i < len(timestamps) and timestamps[i] == timestamp:
             target_idx = i
-            break
+    else:
+        for i, msg in enumerate(messages):
+            if msg.timestamp == timestamp:
+                target_idx = i
+                break
 
     if target_idx is None:
         # Fallback: return first few messages if timestamp not found
-        return messages[:n * 2 + 1]
+        return list(messages[:n * 2 + 1])
 
     # Calculate window bounds
     start = max(0, target_idx - n)
     end = min(len(messages), target_idx + n + 1)
 
-    return messages[start:end]
+    return list(messages[start:end])
@@ -1,18 +1,41 @@
 """ChromaDB vector store for semantic search with hybrid BM25 support."""
 
+import heapq
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from itertools import islice
 
 import chromadb
 from chromadb.utils import embedding_functions
 
-from .config import CHROMA_DIR, COLLECTION_NAME, EMBEDDING_MODEL, ensure_dirs
-from .chunker import load_all_chunks
+from .config import (
+    CHROMA_DIR,
+    CHROMA_MAX_BATCH_SIZE,
+    COLLECTION_NAME,
+    EMBEDDING_MODEL,
+    INSERT_BATCH_SIZE,
+    ensure_dirs,
+)
+from .chunker import iter_all_chunks
+from .text_index import TextIndex, TextSearchResult
 
 
 # Hybrid search weight: higher = more weight on vector search
 # 0.7 means 70% vector, 30% BM25 keyword
 HYBRID_VECTOR_WEIGHT = 0.7
 
+# HNSW index parameters for the collection, pinned so recall doesn't depend
+# on the installed Chroma version (older releases default search_ef to 10,
+# below the candidates fetched per query). Parameters are fixed when a
+# collection is created, so existing indexes pick them up on `rebuild`.
+# The distance space is left at Chroma's default so scores stay comparable.
+COLLECTION_METADATA = {
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 100,
+    "hnsw:M": 16,
+}
+
 
 def get_indexed_count() -> int:
     """Get ChromaDB collection count without loading the embedding model.
@@ -62,82 +85,135 @@ class Store:
         self._collection = self._client.get_or_create_collection(
             name=COLLECTION_NAME,
             embedding_function=self._embedding_fn,
+            metadata=COLLECTION_METADATA,
         )
+        # Opened on first use (indexing or hybrid search) and reused
+        self._text_index = None
+        # Runs the vector half of each search; created on the first search
+        self._executor: ThreadPoolExecutor | None = None
+        self._count: int | None = None
 
     def count(self) -> int:
-        """Get the number of chunks in the collection."""
-        return self._collection.count()
-
-    def rebuild_index(self, batch_size: int = 5000) -> int:
-        """Rebuild the index from chunks.jsonl. Returns count of indexed chunks."""
-        chunks = load_all_chunks()
-
-        if not chunks:
-            return 0
-
-        # Get existing IDs
-        existing = set(self._collection.get()["ids"])
+        """Get the number of chunks in the collection.
 
-        # Filter to new chunks only
-        new_chunks = [c for c in chunks if c.id not in existing]
+        Cached after the first call; rebuild_index and clear reset it.
+        """
+        if self._count is None:
+            self._count = self._collection.count()
+        return self._count
 
-        if not new_chunks:
-            return 0
+    def rebuild_index(self, batch_size: int = INSERT_BATCH_SIZE) -> int:
+        """Rebuild the index from chunks.jsonl. Returns count of indexed chunks.
 
-        # Add chunks in batches (ChromaDB has a max batch size ~5461)
+        batch_size defaults to CLAUDE_MEMORY_INSERT_BATCH (see config).
+        """
+        # Get existing IDs (only IDs; documents and metadata aren't needed)
+        existing = set(self._collection.get(include=[])["ids"])
+
+        # Parse new chunks only; already-indexed lines are skipped unparsed.
+        # Chunks are streamed so only one batch is held in memory at a time
+        new_chunks = iter_all_chunks(exclude=existing)
+
+        # Keep the keyword index in step, so new chunks are parsed only once.
+        # It is optional: if its database is unusable (e.g. locked), vectors
+        # are still indexed and keyword search degrades as in _keyword_search
+        try:
+            text_index = self._get_text_index()
+        except (sqlite3.Error, OSError):
+            text_index = None
+
+        # Add chunks in batches, within the client's max batch size
+        batch_size = min(batch_size, self._max_batch_size())
         total_added = 0
-        for i in range(0, len(new_chunks), batch_size):
-            batch = new_chunks[i : i + batch_size]
-            self._collection.add(
-                ids=[c.id for c in batch],
-                documents=[c.text for c in batch],
-                metadatas=[
-                    {
-                        "session_id": c.session_id,
-                        "timestamp": c.timestamp,
-                        "chunk_type": c.chunk_type,
-                        "turn_index": c.turn_index,
-                        # Split chunk tracking
-                        "parent_turn_id": c.parent_turn_id,
-                        "chunk_index": c.chunk_index,
-                        "total_chunks": c.total_chunks,
-                        # Tool metadata
-                        "tools_used": c.tools_used,
-                        "files_touched": c.files_touched,
-                        "commands_run": c.commands_run,
-                    }
-                    for c in batch
-                ],
-            )
+        while batch := list(islice(new_chunks, batch_size)):
+            # Build the parallel lists in one pass over the batch
+            ids = []
+            documents = []
+            metadatas = []
+            for c in batch:
+                ids.append(c.id)
+                documents.append(c.text)
+                metadatas.append(c.as_metadata())
+            self._collection.add(ids=ids, documents=documents, metadatas=metadatas)
+            if text_index is not None:
+                try:
+                    text_index.add_batch((c.id, c.text, c.session_id, c.timestamp) for c in batch)
+                except sqlite3.Error:
+                    text_index = None
             total_added += len(batch)
 
+        if total_added:
+            self._count = None
         return total_added
 
+    def _max_batch_size(self) -> int:
+        """Get the largest batch the Chroma client accepts in one add."""
+        # Newer clients expose a method, older ones a property
+        if get_max := getattr(self._client, "get_max_batch_size", None):
+            return get_max()
+        return getattr(self._client, "max_batch_size", CHROMA_MAX_BATCH_SIZE)
+
     def _vector_search(
         self,
-        query: str,
+        queries: list[str],
         n: int,
-    ) -> list[tuple[str, float, dict]]:
-        """Internal vector search returning (chunk_id, distance, metadata) tuples."""
-        if self._collection.count() == 0:
-            return []
+    ) -> list[list[tuple[str, float, dict]]]:
+        """Internal vector search returning (chunk_id, distance, metadata) tuples per query.
+
+        All queries are embedded and looked up in one collection query.
+        n must not exceed the collection size; search caps it at the count.
+        """
+        if n <= 0 or not queries:
+            return [[] for _ in queries]
 
         results = self._collection.query(
-            query_texts=[query],
+            query_texts=queries,
             n_results=n,
             include=["documents", "metadatas", "distances"],
         )
 
-        output = []
-        if results["ids"] and results["ids"][0]:
-            for i, chunk_id in enumerate(results["ids"][0]):
-                doc = results["documents"][0][i] if results["documents"] else ""
-                metadata = results["metadatas"][0][i] if results["metadatas"] else {}
-                distance = results["distances"][0][i] if results["distances"] else 0.0
-                metadata["text"] = doc  # Include text in metadata for convenience
-                output.append((chunk_id, distance, metadata))
-
-        return output
+        # Look the result lists up once rather than per row
+        all_ids = results["ids"]
+        all_docs = results["documents"]
+        all_metas = results["metadatas"]
+        all_dists = results["distances"]
+
+        outputs = []
+        for q in range(len(queries)):
+            output = []
+            ids = all_ids[q] if all_ids else None
+            if ids:
+                docs = all_docs[q] if all_docs else None
+                metas = all_metas[q] if all_metas else None
+                dists = all_dists[q] if all_dists else None
+                for i, chunk_id in enumerate(ids):
+                    metadata = metas[i] if metas else {}
+                    metadata["text"] = docs[i] if docs else ""  # Include text for convenience
+                    output.append((chunk_id, dists[i] if dists else 0.0, metadata))
+            outputs.append(output)
+
+        return outputs
+
+    def _get_text_index(self) -> TextIndex:
+        """Open the text index on first use and reuse it afterwards."""
+        if self._text_index is None:
+            self._text_index = TextIndex()
+        return self._text_index
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Start the search worker on first use and reuse it afterwards."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        return self._executor
+
+    def _keyword_search(self, query: str, n: int) -> list[TextSearchResult]:
+        """Internal BM25 search; returns [] if the text index isn't available."""
+        try:
+            return self._get_text_index().search(query, n=n)
+        except (sqlite3.Error, OSError):
+            # Text index not available (e.g. locked or unreadable database),
+            # fall back to vector-only
+            return []
 
     def search(
         self,
@@ -155,15 +231,50 @@ class Store:
                           (keeps best match from each parent turn).
             hybrid: If True, combine vector search with BM25 keyword search (default).
         """
-        if self._collection.count() == 0:
-            return []
+        return self.search_many([query], n=n, dedupe_splits=dedupe_splits, hybrid=hybrid)[0]
 
-        # Fetch extra results to account for deduplication and filtering
-        fetch_n = min(n * 5, self._collection.count()) if dedupe_splits else min(n * 2, self._collection.count())
+    def search_many(
+        self,
+        queries: list[str],
+        n: int = 5,
+        dedupe_splits: bool = True,
+        hybrid: bool = True,
+    ) -> list[list[SearchResult]]:
+        """Search for several queries at once; see search for the arguments.
 
-        # Get vector search results
-        vector_results = self._vector_search(query, fetch_n)
+        The queries are embedded as one batch and looked up in a single
+        vector query, which is faster than searching them one at a time.
+        Returns one result list per query, in order.
+        """
+        total = self.count()
+        if total == 0:
+            return [[] for _ in queries]
 
+        # Fetch extra results to account for deduplication and filtering
+        fetch_n = min(n * 5, total) if dedupe_splits else min(n * 2, total)
+
+        # Run the vector search (query embedding + ANN lookup, which release
+        # the GIL) in a worker while the keyword searches run here; the text
+        # index's SQLite connection must stay on the thread that opened it
+        vector_future = self._get_executor().submit(self._vector_search, queries, fetch_n)
+        bm25_results = [
+            self._keyword_search(query, fetch_n) if hybrid else [] for query in queries
+        ]
+        vector_results = vector_future.result()
+
+        return [
+            self._rank(vector, bm25, n, dedupe_splits)
+            for vector, bm25 in zip(vector_results, bm25_results)
+        ]
+
+    def _rank(
+        self,
+        vector_results: list[tuple[str, float, dict]],
+        bm25_results: list[TextSearchResult],
+        n: int,
+        dedupe_splits: bool,
+    ) -> list[SearchResult]:
+        """Combine one query's vector and keyword results into the top n."""
         # Build scores dict: chunk_id -> (combined_score, metadata)
         # For vector distance: lower is better, normalize to [0, 1]
         scores: dict[str, tuple[float, dict]] = {}
@@ -175,91 +286,94 @@ class Store:
                 norm_vector = distance / max_dist  # 0 = perfect match, 1 = worst
                 scores[chunk_id] = (norm_vector, metadata)
 
-        # Add BM25 results if hybrid search is enabled
-        if hybrid:
-            try:
-                from .text_index import TextIndex
-                text_index = TextIndex()
-                bm25_results = text_index.search(query, n=fetch_n)
-
-                if bm25_results:
-                    # BM25 scores are negative (more negative = better)
-                    # Normalize to [0, 1] where 0 is best
-                    min_score = min(r.bm25_score for r in bm25_results)
-                    max_score = max(r.bm25_score for r in bm25_results)
-                    score_range = max_score - min_score if max_score != min_score else 1.0
-
-                    for result in bm25_results:
-                        # Normalize: 0 = best match, 1 = worst
-                        norm_bm25 = (result.bm25_score - min_score) / score_range
-
-                        if result.chunk_id in scores:
-                            # Combine scores: weighted average
-                            old_score, metadata = scores[result.chunk_id]
-                            combined = (HYBRID_VECTOR_WEIGHT * old_score +
-                                       (1 - HYBRID_VECTOR_WEIGHT) * norm_bm25)
-                            scores[result.chunk_id] = (combined, metadata)
-                        else:
-                            # BM25-only result: use BM25 score with penalty for no vector match
-                            # This ensures vector matches still rank higher when available
-                            scores[result.chunk_id] = (
-                                0.5 + (1 - HYBRID_VECTOR_WEIGHT) * norm_bm25,
-                                {
-                                    "text": result.text,
-                                    "session_id": result.session_id,
-                                    "timestamp": result.timestamp,
-                                    "chunk_type": "turn",
-                                    "turn_index": 0,
-                                    "parent_turn_id": "",
-                                    "chunk_index": 0,
-                                    "total_chunks": 1,
-                                    "tools_used": "",
-                                    "files_touched": "",
-                                    "commands_run": "",
-                                }
-                            )
-            except Exception:
-                # Text index not available, fall back to vector-only
-                pass
-
-        # Sort by combined score (lower is better)
-        sorted_results = sorted(scores.items(), key=lambda x: x[0][0])
-
-        # Convert to SearchResult objects
-        search_results = []
-        for chunk_id, (score, metadata) in sorted_results:
-            search_results.append(
-                SearchResult(
-                    text=metadata.get("text", ""),
-                    session_id=metadata.get("session_id", ""),
-                    timestamp=metadata.get("timestamp", ""),
-                    distance=score,  # Combined score
-                    chunk_type=metadata.get("chunk_type", "turn"),
-                    turn_index=metadata.get("turn_index", 0),
-                    parent_turn_id=metadata.get("parent_turn_id", ""),
-                    chunk_index=metadata.get("chunk_index", 0),
-                    total_chunks=metadata.get("total_chunks", 1),
-                    tools_used=metadata.get("tools_used", ""),
-                    files_touched=metadata.get("files_touched", ""),
-                    commands_run=metadata.get("commands_run", ""),
-                )
-            )
-
-        # Deduplicate by parent_turn_id (keep best match from each split turn)
+        # Add BM25 results (empty unless hybrid search is enabled)
+        if bm25_results:
+            # BM25 scores are negative (more negative = better)
+            # Normalize to [0, 1] where 0 is best
+            min_score = min(r.bm25_score for r in bm25_results)
+            max_score = max(r.bm25_score for r in bm25_results)
+            score_range = max_score - min_score if max_score != min_score else 1.0
+
+            for result in bm25_results:
+                # Normalize: 0 = best match, 1 = worst
+                norm_bm25 = (result.bm25_score - min_score) / score_range
+
+                if result.chunk_id in scores:
+                    # Combine scores: weighted average
+                    old_score, metadata = scores[result.chunk_id]
+                    combined = (HYBRID_VECTOR_WEIGHT * old_score +
+                               (1 - HYBRID_VECTOR_WEIGHT) * norm_bm25)
+                    scores[result.chunk_id] = (combined, metadata)
+                else:
+                    # BM25-only result: use BM25 score with penalty for no vector match
+                    # This ensures vector matches still rank higher when available
+                    scores[result.chunk_id] = (
+                        0.5 + (1 - HYBRID_VECTOR_WEIGHT) * norm_bm25,
+                        {
+                            "text": result.text,
+                            "session_id": result.session_id,
+                            "timestamp": result.timestamp,
+                            "chunk_type": "turn",
+                            "turn_index": 0,
+                            "parent_turn_id": "",
+                            "chunk_index": 0,
+                            "total_chunks": 1,
+                            "tools_used": "",
+                            "files_touched": "",
+                            "commands_run": "",
+                        }
+                    )
+
+        # Rank by combined score (lower is better). Only the best few are
+        # needed, so select them from a heap instead of sorting everything;
+        # the index breaks ties in insertion order, like a stable sort would.
+        heap = [
+            (score, i, metadata)
+            for i, (score, metadata) in enumerate(scores.values())
+        ]
+        if dedupe_splits:
+            # Dedup can skip entries, so pop lazily until there are n results
+            heapq.heapify(heap)
+            ranked = (heapq.heappop(heap) for _ in range(len(heap)))
+        else:
+            ranked = heapq.nsmallest(n, heap)
+
+        # Deduplicate by parent_turn_id (keep best match from each split
+        # turn) before building results, so skipped splits cost nothing
         if dedupe_splits:
             seen_parents: set[str] = set()
             deduped = []
-            for result in search_results:
-                # Use parent_turn_id if this is a split chunk, otherwise treat as unique
-                key = result.parent_turn_id if result.parent_turn_id else f"__unique_{len(deduped)}"
-                if key not in seen_parents:
-                    seen_parents.add(key)
-                    deduped.append(result)
-                    if len(deduped) >= n:
-                        break
+            for score, _, metadata in ranked:
+                # Split chunks share their turn's parent_turn_id; others are unique
+                parent = metadata.get("parent_turn_id", "")
+                if parent:
+                    if parent in seen_parents:
+                        continue
+                    seen_parents.add(parent)
+                deduped.append(self._to_search_result(score, metadata))
+                if len(deduped) >= n:
+                    break
             return deduped
 
-        return search_results[:n]
+        return [self._to_search_result(score, metadata) for score, _, metadata in ranked]
+
+    @staticmethod
+    def _to_search_result(score: float, metadata: dict) -> SearchResult:
+        """Build a SearchResult from a combined score and chunk metadata."""
+        return SearchResult(
+            text=metadata.get("text", ""),
+            session_id=metadata.get("session_id", ""),
+            timestamp=metadata.get("timestamp", ""),
+            distance=score,  # Combined score
+            chunk_type=metadata.get("chunk_type", "turn"),
+            turn_index=metadata.get("turn_index", 0),
+            parent_turn_id=metadata.get("parent_turn_id", ""),
+            chunk_index=metadata.get("chunk_index", 0),
+            total_chunks=metadata.get("total_chunks", 1),
+            tools_used=metadata.get("tools_used", ""),
+            files_touched=metadata.get("files_touched", ""),
+            commands_run=metadata.get("commands_run", ""),
+        )
 
     def clear(self) -> None:
         """Clear all data from the collection."""
@@ -267,4 +381,15 @@ class Store:
         self._collection = self._client.get_or_create_collection(
             name=COLLECTION_NAME,
             embedding_function=self._embedding_fn,
+            metadata=COLLECTION_METADATA,
         )
+        self._count = None
+
+    def close(self) -> None:
+        """Stop the search worker and close the text index, if they were opened."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._text_index is not None:
+            self._text_index.close()
+            self._text_index = None
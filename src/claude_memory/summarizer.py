@@ -1,12 +1,20 @@
 """Generate conversation summaries using Ollama."""
 
-import json
-import subprocess
-from dataclasses import asdict
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Iterator
-
-from .chunker import Chunk, load_all_chunks
+from urllib.parse import urlsplit
+
+from . import _json as json
+from .chunker import (
+    Chunk,
+    chunk_fingerprint,
+    load_all_chunks,
+    load_chunk_index,
+    save_chunk_index,
+)
 from .config import CHUNKS_FILE, ensure_dirs
 from .parser import get_conversation_files, parse_conversation
 
@@ -15,21 +23,76 @@ from .parser import get_conversation_files, parse_conversation
 DEFAULT_MODEL = "qwen2.5:1.5b"
 
 
+# Conversations summarized concurrently by sync_summaries
+SUMMARY_WORKERS = 4
+
+# How long Ollama keeps the model loaded after a request, so consecutive
+# summaries don't reload it
+KEEP_ALIVE = "10m"
+
+
+def get_ollama_url() -> str:
+    """Get the Ollama server URL.
+
+    Uses OLLAMA_HOST (as the ollama CLI does), defaulting to the local server.
+    Like the CLI, a host given without a scheme or port uses port 11434.
+    """
+    host = os.environ.get("OLLAMA_HOST", "").strip() or "127.0.0.1:11434"
+    if "://" not in host:
+        host = f"http://{host}"
+        if urlsplit(host).port is None:
+            host = host.rstrip("/") + ":11434"
+    return host.rstrip("/")
+
+
+def _ollama_request(path: str, payload: dict | None = None, timeout: float = 5) -> dict:
+    """Call the Ollama HTTP API and return the decoded JSON response.
+
+    Sends a POST with a JSON body when payload is given, a GET otherwise.
+    Raises OSError (including URLError, timeouts and malformed HTTP
+    responses) if the server can't be reached, and ValueError if the
+    response isn't a JSON object.
+    """
+    # Imported here: urllib.request loads http.client and ssl, which only
+    # summary generation needs
+    import http.client
+    import urllib.request
+
+    data = json.dumps(payload) if payload is not None else None
+    request = urllib.request.Request(
+        get_ollama_url() + path,
+        data=data,
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+    except http.client.HTTPException as e:
+        # IncompleteRead, BadStatusLine etc. aren't OSErrors
+        raise OSError(f"Bad response from Ollama: {e!r}") from e
+
+    result = json.loads(body)
+    if not isinstance(result, dict):
+        raise ValueError("Expected a JSON object from Ollama")
+    return result
+
+
+@lru_cache(maxsize=8)
 def is_ollama_available(model: str = DEFAULT_MODEL) -> bool:
-    """Check if Ollama is installed and the model is available."""
+    """Check if the Ollama server is running and the model is available.
+
+    The answer is cached for the life of the process; call
+    is_ollama_available.cache_clear() to check again.
+    """
     try:
-        result = subprocess.run(
-            ["ollama", "list"],
-            capture_output=True,
-            text=True,
-            timeout=5,
-        )
-        if result.returncode != 0:
-            return False
-        # Check if model is in the list
-        return model.split(":")[0] in result.stdout
-    except (subprocess.TimeoutExpired, FileNotFoundError):
+        models = _ollama_request("/api/tags").get("models") or []
+    except (OSError, ValueError):
+        return False
+    if not isinstance(models, list):
         return False
+    # Check if model is in the list
+    base_name = model.split(":")[0]
+    return any(isinstance(m, dict) and base_name in m.get("name", "") for m in models)
 
 # Prompt template for generating conversation summaries
 SUMMARY_PROMPT = """Summarize this conversation between a user and an AI assistant in 2-3 sentences. Focus on:
@@ -48,17 +111,15 @@ def get_conversation_text(filepath: Path, max_turns: int = 50) -> tuple[str, str
 
     Returns (text, last_timestamp, turn_count).
     """
-    from .parser import parse_conversation
-
-    messages = list(parse_conversation(filepath))
-
     # Build conversation text
     parts = []
     turn_count = 0
     last_timestamp = ""
 
+    # Messages are read lazily, so the rest of the file isn't parsed once
+    # max_turns is reached
     user_msg = None
-    for msg in messages:
+    for msg in parse_conversation(filepath):
         if msg.role == "user":
             user_msg = msg
         elif msg.role == "assistant" and user_msg is not None:
@@ -85,18 +146,21 @@ def generate_summary_ollama(conversation_text: str, model: str = DEFAULT_MODEL)
     """
     prompt = SUMMARY_PROMPT.format(conversation=conversation_text)
 
+    # Use the HTTP API rather than `ollama run`, which would start a new
+    # process per conversation
     try:
-        result = subprocess.run(
-            ["ollama", "run", model, prompt],
-            capture_output=True,
-            text=True,
-            timeout=60,
+        result = _ollama_request(
+            "/api/generate",
+            {"model": model, "prompt": prompt, "stream": False, "keep_alive": KEEP_ALIVE},
+            # Allows for time queued behind the other summary workers
+            timeout=120,
         )
-        if result.returncode == 0:
-            return result.stdout.strip()
+    except (OSError, ValueError):
         return None
-    except (subprocess.TimeoutExpired, FileNotFoundError):
+    response = result.get("response")
+    if not isinstance(response, str):
         return None
+    return response.strip() or None
 
 
 def get_existing_summary_ids() -> set[str]:
@@ -105,43 +169,61 @@ def get_existing_summary_ids() -> set[str]:
     return {c.id for c in chunks if c.chunk_type == "summary"}
 
 
+def _summarize_conversation(filepath: Path, model: str) -> tuple[str, Chunk | None] | None:
+    """Generate the summary chunk for one conversation.
+
+    Returns (session_id, chunk), where chunk is None if generation failed,
+    or None if the conversation is too short to summarize.
+    """
+    session_id = filepath.stem
+
+    # Get conversation text
+    conv_text, last_timestamp, turn_count = get_conversation_text(filepath)
+
+    # Skip very short conversations (< 2 turns)
+    if turn_count < 2:
+        return None
+
+    # Generate summary
+    summary = generate_summary_ollama(conv_text, model)
+
+    if not summary:
+        return session_id, None
+    chunk = Chunk(
+        id=f"summary-{session_id}",
+        text=summary,
+        timestamp=last_timestamp,
+        session_id=session_id,
+        chunk_type="summary",
+        turn_index=-1,  # -1 indicates this is a summary, not a turn
+    )
+    return session_id, chunk
+
+
 def generate_summaries(model: str = DEFAULT_MODEL, force: bool = False) -> Iterator[tuple[str, Chunk | None]]:
     """Generate summary chunks for all conversations.
 
     Yields (session_id, chunk) tuples. chunk is None if generation failed.
     Skips conversations that already have summaries unless force=True.
+    Conversations are summarized SUMMARY_WORKERS at a time, but results are
+    yielded in conversation order.
     """
     existing_ids = set() if force else get_existing_summary_ids()
 
-    for filepath in get_conversation_files():
-        session_id = filepath.stem
-        summary_id = f"summary-{session_id}"
-
-        if summary_id in existing_ids:
-            continue
-
-        # Get conversation text
-        conv_text, last_timestamp, turn_count = get_conversation_text(filepath)
+    pending = [
+        filepath
+        for filepath in get_conversation_files()
+        if f"summary-{filepath.stem}" not in existing_ids
+    ]
+    if not pending:
+        return
 
-        # Skip very short conversations (< 2 turns)
-        if turn_count < 2:
-            continue
-
-        # Generate summary
-        summary = generate_summary_ollama(conv_text, model)
-
-        if summary:
-            chunk = Chunk(
-                id=summary_id,
-                text=summary,
-                timestamp=last_timestamp,
-                session_id=session_id,
-                chunk_type="summary",
-                turn_index=-1,  # -1 indicates this is a summary, not a turn
-            )
-            yield session_id, chunk
-        else:
-            yield session_id, None
+    # Each summary is a slow request that mostly waits on Ollama, so keep a
+    # few in flight; Ollama serves them in parallel or queues them
+    with ThreadPoolExecutor(max_workers=SUMMARY_WORKERS) as executor:
+        for result in executor.map(lambda fp: _summarize_conversation(fp, model), pending):
+            if result is not None:
+                yield result
 
 
 def sync_summaries(model: str = DEFAULT_MODEL, quiet: bool = False) -> tuple[int, int]:
@@ -154,17 +236,34 @@ def sync_summaries(model: str = DEFAULT_MODEL, quiet: bool = False) -> tuple[int
     generated = 0
     failed = 0
 
-    for session_id, chunk in generate_summaries(model):
-        if chunk:
-            # Append to chunks file
-            with open(CHUNKS_FILE, "a") as f:
-                f.write(json.dumps(asdict(chunk)) + "\n")
-            generated += 1
-            if not quiet:
-                print(f"  Generated summary for {session_id[:8]}...")
-        else:
-            failed += 1
-            if not quiet:
-                print(f"  Failed to generate summary for {session_id[:8]}...")
+    # Keep the chunk index current so the next sync doesn't have to rescan
+    chunk_index = load_chunk_index()
+
+    # Opened on the first summary and kept open for the rest of the run, so
+    # runs that generate nothing never create the chunks file
+    f = None
+    try:
+        for session_id, chunk in generate_summaries(model):
+            if chunk:
+                if f is None:
+                    f = open(CHUNKS_FILE, "ab", buffering=1 << 20)
+                # Append to chunks file, as sync_chunks does
+                f.write(json.dumps(chunk.to_dict()))
+                f.write(b"\n")
+                if chunk_index is not None:
+                    chunk_index.add(chunk_fingerprint(chunk.id.encode("utf-8")))
+                generated += 1
+                if not quiet:
+                    print(f"  Generated summary for {session_id[:8]}...")
+            else:
+                failed += 1
+                if not quiet:
+                    print(f"  Failed to generate summary for {session_id[:8]}...")
+    finally:
+        if f is not None:
+            f.close()
+
+    if chunk_index is not None and generated:
+        save_chunk_index(chunk_index)
 
     return generated, failed
@@ -1,12 +1,23 @@
 """SQLite FTS5 text index for BM25 keyword search."""
 
+import re
 import sqlite3
 from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
+from typing import Iterable
 
 from .config import get_storage_dir, ensure_dirs
 
 
+# Rows inserted per executemany call in add_batch
+ADD_BATCH_SIZE = 1024
+
+# Matches FTS5 operators and phrase quotes in a user query (one scan,
+# without building an uppercased copy of the query)
+FTS5_OPERATOR_RE = re.compile(r' (?:AND|OR|NOT) |"', re.IGNORECASE)
+
+
 def get_text_index_db() -> Path:
     """Get the text index database path (respects CLAUDE_MEMORY_STORAGE)."""
     return get_storage_dir() / "text_index.db"
@@ -30,11 +41,20 @@ class TextIndex:
     semantic search might miss (e.g., class names, function names, file paths).
     """
 
-    def __init__(self, db_path: Path | None = None):
+    def __init__(self, db_path: Path | str | None = None):
+        """Open the index at db_path (default: text_index.db in storage).
+
+        Pass ":memory:" for a throwaway in-memory index.
+        """
         ensure_dirs()
         self._db_path = db_path or get_text_index_db()
         self._conn = sqlite3.connect(str(self._db_path))
         self._conn.row_factory = sqlite3.Row
+        # WAL with synchronous=NORMAL syncs on checkpoints rather than on
+        # every commit, which is still crash-safe for the database (the index
+        # can be rebuilt from the chunk files anyway)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
         self._init_schema()
 
     def _init_schema(self) -> None:
@@ -98,32 +118,56 @@ class TextIndex:
         )
         self._conn.commit()
 
-    def add_batch(self, chunks: list[tuple[str, str, str, str]]) -> int:
+    def add_batch(self, chunks: Iterable[tuple[str, str, str, str]]) -> int:
         """Add multiple chunks to the index.
 
         Args:
-            chunks: List of (chunk_id, text, session_id, timestamp) tuples.
+            chunks: Iterable of (chunk_id, text, session_id, timestamp) tuples.
+                Consumed lazily in windows of ADD_BATCH_SIZE, so a generator
+                keeps memory bounded regardless of how many chunks there are.
 
         Returns:
             Number of chunks added (excludes already-indexed).
         """
-        existing = self.get_indexed_ids()
-        new_chunks = [(cid, text, sid, ts) for cid, text, sid, ts in chunks if cid not in existing]
+        cursor = self._conn.cursor()
+        # Each window is staged in a temp table and already-indexed chunks
+        # are filtered out in SQL, so the indexed IDs are never loaded
+        cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS staged_chunks (
+                chunk_id TEXT,
+                text TEXT,
+                session_id TEXT,
+                timestamp TEXT
+            )
+        """)
 
-        if not new_chunks:
-            return 0
+        chunks = iter(chunks)
+        added = 0
+        try:
+            while batch := list(islice(chunks, ADD_BATCH_SIZE)):
+                cursor.executemany(
+                    "INSERT INTO staged_chunks (chunk_id, text, session_id, timestamp) VALUES (?, ?, ?, ?)",
+                    batch,
+                )
+                # Only the first staged row per ID is indexed, as with add()
+                cursor.execute("""
+                    INSERT INTO chunks_fts (chunk_id, text, session_id, timestamp)
+                    SELECT chunk_id, text, session_id, timestamp FROM staged_chunks
+                    WHERE rowid IN (SELECT MIN(rowid) FROM staged_chunks GROUP BY chunk_id)
+                    AND chunk_id NOT IN (SELECT chunk_id FROM indexed_chunks)
+                """)
+                added += cursor.rowcount
+                cursor.execute(
+                    "INSERT OR IGNORE INTO indexed_chunks (chunk_id) SELECT chunk_id FROM staged_chunks"
+                )
+                cursor.execute("DELETE FROM staged_chunks")
+        except BaseException:
+            # Also discards any staged rows, so a later call can't commit them
+            self._conn.rollback()
+            raise
 
-        cursor = self._conn.cursor()
-        cursor.executemany(
-            "INSERT INTO chunks_fts (chunk_id, text, session_id, timestamp) VALUES (?, ?, ?, ?)",
-            new_chunks,
-        )
-        cursor.executemany(
-            "INSERT INTO indexed_chunks (chunk_id) VALUES (?)",
-            [(c[0],) for c in new_chunks],
-        )
         self._conn.commit()
-        return len(new_chunks)
+        return added
 
     def search(self, query: str, n: int = 20) -> list[TextSearchResult]:
         """Search for chunks matching the query using BM25.
@@ -177,7 +221,7 @@ class TextIndex:
         - Adds prefix matching for partial words
         """
         # If query contains FTS5 operators, use as-is
-        if any(op in query.upper() for op in [" AND ", " OR ", " NOT ", '"']):
+        if FTS5_OPERATOR_RE.search(query):
             return query
 
         # Split into words and add prefix matching
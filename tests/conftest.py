@@ -1,70 +1,127 @@
 """Shared test fixtures and configuration."""
 
+import importlib
 import json
-import tempfile
 from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def fixtures_dir():
     """Path to the test fixtures directory."""
     return Path(__file__).parent / "fixtures"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def short_conversation(fixtures_dir):
     """Path to short conversation fixture."""
     return fixtures_dir / "short-conversation.jsonl"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def multi_exchange(fixtures_dir):
     """Path to multi-exchange conversation fixture."""
     return fixtures_dir / "multi-exchange.jsonl"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def with_tool_calls(fixtures_dir):
     """Path to conversation with tool calls fixture."""
     return fixtures_dir / "with-tool-calls.jsonl"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def file_history_only(fixtures_dir):
     """Path to file-history-only fixture."""
     return fixtures_dir / "file-history-only.jsonl"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def empty_file(fixtures_dir):
     """Path to empty file fixture."""
     return fixtures_dir / "empty.jsonl"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def long_conversation(fixtures_dir):
     """Path to long conversation fixture (6 exchanges)."""
     return fixtures_dir / "long-conversation.jsonl"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def with_rich_tool_calls(fixtures_dir):
     """Path to conversation with rich tool usage fixture."""
     return fixtures_dir / "with-rich-tool-calls.jsonl"
 
 
 @pytest.fixture
-def temp_dir():
+def temp_dir(tmp_path):
     """Create a temporary directory for tests."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        yield Path(tmpdir)
+    return tmp_path
+
+
+@pytest.fixture
+def fresh_chunker(temp_dir, monkeypatch):
+    """Point storage and project dirs into temp_dir and reload the modules.
+
+    config.py resolves its paths at import time, so config, parser and
+    chunker are reloaded after the environment is set; import from them
+    inside the test. Returns a namespace with storage_dir and project_dir.
+    """
+    storage_dir = temp_dir / "storage"
+    project_dir = temp_dir / "project"
+    project_dir.mkdir()
+
+    monkeypatch.setenv("CLAUDE_MEMORY_STORAGE", str(storage_dir))
+    monkeypatch.setenv("CLAUDE_MEMORY_PROJECT", str(project_dir))
+
+    import claude_memory.config
+    import claude_memory.parser
+    import claude_memory.chunker
+    importlib.reload(claude_memory.config)
+    importlib.reload(claude_memory.parser)
+    importlib.reload(claude_memory.chunker)
+
+    claude_memory.config.ensure_dirs()
+    return SimpleNamespace(storage_dir=storage_dir, project_dir=project_dir)
+
+
+@pytest.fixture
+def tmp_storage(temp_dir, monkeypatch):
+    """Point the storage dir into temp_dir and reload config, chunker and store.
+
+    Returns (Store, CHUNKS_FILE) from the reloaded modules.
+    """
+    return reload_store_modules(monkeypatch, temp_dir / "storage")
+
+
+def reload_store_modules(monkeypatch, storage_dir: Path):
+    """Reload config, chunker and store against storage_dir (for fixtures
+    that can't use tmp_storage). Returns (Store, CHUNKS_FILE).
+    """
+    monkeypatch.setenv("CLAUDE_MEMORY_STORAGE", str(storage_dir))
+
+    import claude_memory.config
+    import claude_memory.chunker
+    import claude_memory.store
+    importlib.reload(claude_memory.config)
+    importlib.reload(claude_memory.chunker)
+    importlib.reload(claude_memory.store)
+
+    claude_memory.config.ensure_dirs()
+    return claude_memory.store.Store, claude_memory.config.CHUNKS_FILE
 
 
 @pytest.fixture
 def sample_conversation_data():
     """Return sample conversation data for creating test files."""
+    return sample_conversation()
+
+
+def sample_conversation() -> list[dict]:
+    """Build the sample conversation (for fixtures that can't use the fixture)."""
     return [
         {"type": "user", "uuid": "u1", "timestamp": "2025-01-15T10:00:00Z",
          "sessionId": "test-session", "message": {"role": "user", "content": "Hello"}},
@@ -76,6 +133,4 @@ def sample_conversation_data():
 
 def write_jsonl(path: Path, data: list[dict]) -> None:
     """Helper to write JSONL data to a file."""
-    with open(path, "w") as f:
-        for item in data:
-            f.write(json.dumps(item) + "\n")
+    path.write_text("".join(json.dumps(item) + "\n" for item in data))
@@ -1,10 +1,12 @@
 """Tests for the chunker module."""
 
 import json
-from pathlib import Path
+import os
 
 import pytest
 
+from conftest import write_jsonl
+
 
 class TestChunkConversation:
     """Tests for chunk_conversation function."""
@@ -117,39 +119,70 @@ class TestCreateChunk:
         assert chunk.timestamp == "2025-01-15T10:00:01Z"
         assert chunk.session_id == "test"
 
+    def test_to_dict_matches_asdict(self):
+        """to_dict should produce the same fields as dataclasses.asdict."""
+        from dataclasses import asdict
+
+        from claude_memory.chunker import Chunk
+
+        chunk = Chunk(
+            id="asst-uuid-1",
+            text="Some text",
+            timestamp="2025-01-15T10:00:01Z",
+            session_id="test",
+            parent_turn_id="asst-uuid",
+            chunk_index=1,
+            total_chunks=2,
+            tools_used="Read",
+        )
+
+        assert chunk.to_dict() == asdict(chunk)
+
+    def test_as_metadata_is_dict_without_id_and_text(self):
+        """as_metadata has every field except id and text."""
+        from claude_memory.chunker import Chunk
+
+        chunk = Chunk(id="asst-uuid", text="Some text", timestamp="2025-01-15T10:00:01Z", session_id="test")
+
+        expected = chunk.to_dict()
+        del expected["id"], expected["text"]
+        assert chunk.as_metadata() == expected
+
+
+class TestIsExcludedMessage:
+    """Tests for is_excluded_message function."""
+
+    def test_excluded_regardless_of_case_and_whitespace(self):
+        """Warmup messages are excluded however they're cased or padded."""
+        from claude_memory.chunker import is_excluded_message
+
+        assert is_excluded_message("Warmup")
+        assert is_excluded_message("  WARMUP\n")
+        assert is_excluded_message("warmup" + " " * 100)
+
+    def test_other_messages_kept(self):
+        """Normal and merely similar messages are not excluded."""
+        from claude_memory.chunker import is_excluded_message
+
+        assert not is_excluded_message("Warmup the cache before deploying")
+        assert not is_excluded_message("warm up")
+        assert not is_excluded_message("")
+
 
 class TestSyncChunks:
     """Tests for sync_chunks and related functions.
 
-    Note: These tests require careful module reloading because config.py
-    has module-level constants that are evaluated at import time.
+    Note: These tests use the fresh_chunker fixture, which reloads the
+    modules because config.py has module-level constants that are
+    evaluated at import time.
     """
 
-    def test_sync_new_conversation(self, temp_dir, sample_conversation_data, monkeypatch):
+    def test_sync_new_conversation(self, fresh_chunker, sample_conversation_data):
         """Syncing a new conversation should create chunks."""
-        from conftest import write_jsonl
-
-        storage_dir = temp_dir / "storage"
-        project_dir = temp_dir / "project"
-        storage_dir.mkdir()
-        project_dir.mkdir()
-
-        monkeypatch.setenv("CLAUDE_MEMORY_STORAGE", str(storage_dir))
-        monkeypatch.setenv("CLAUDE_MEMORY_PROJECT", str(project_dir))
-
-        # Reimport everything with fresh config
-        import importlib
-        import claude_memory.config
-        importlib.reload(claude_memory.config)
-        import claude_memory.parser
-        importlib.reload(claude_memory.parser)
-        import claude_memory.chunker
-        importlib.reload(claude_memory.chunker)
+        project_dir = fresh_chunker.project_dir
 
         from claude_memory.chunker import sync_chunks, load_all_chunks
-        from claude_memory.config import CHUNKS_FILE, ensure_dirs
-
-        ensure_dirs()
+        from claude_memory.config import CHUNKS_FILE
 
         # Create a test conversation
         conv_file = project_dir / "test-session.jsonl"
@@ -168,29 +201,19 @@ class TestSyncChunks:
         assert "Hello" in chunks[0].text
         assert "Hi there!" in chunks[0].text
 
-    def test_sync_skips_already_processed(self, temp_dir, sample_conversation_data, monkeypatch):
-        """Second sync should skip already-processed files."""
-        from conftest import write_jsonl
-
-        storage_dir = temp_dir / "storage"
-        project_dir = temp_dir / "project"
-        storage_dir.mkdir()
-        project_dir.mkdir()
-
-        monkeypatch.setenv("CLAUDE_MEMORY_STORAGE", str(storage_dir))
-        monkeypatch.setenv("CLAUDE_MEMORY_PROJECT", str(project_dir))
-
-        import importlib
-        import claude_memory.config
-        importlib.reload(claude_memory.config)
-        import claude_memory.parser
-        importlib.reload(claude_memory.parser)
-        import claude_memory.chunker
-        importlib.reload(claude_memory.chunker)
+    def test_sync_nothing_new_creates_no_chunks_file(self, fresh_chunker):
+        """A sync with no new chunks doesn't create an empty chunks file."""
         from claude_memory.chunker import sync_chunks
-        from claude_memory.config import ensure_dirs
+        from claude_memory.config import CHUNKS_FILE
+
+        assert sync_chunks() == (0, 0)
+        assert not CHUNKS_FILE.exists()
 
-        ensure_dirs()
+    def test_sync_skips_already_processed(self, fresh_chunker, sample_conversation_data):
+        """Second sync should skip already-processed files."""
+        project_dir = fresh_chunker.project_dir
+
+        from claude_memory.chunker import sync_chunks
 
         # Create a test conversation
         conv_file = project_dir / "test-session.jsonl"
@@ -205,30 +228,11 @@ class TestSyncChunks:
         assert new_chunks2 == 0
         assert new_files2 == 0
 
-    def test_sync_detects_modified_file(self, temp_dir, sample_conversation_data, monkeypatch):
+    def test_sync_detects_modified_file(self, fresh_chunker, sample_conversation_data):
         """Sync should detect and reprocess modified files."""
-        from conftest import write_jsonl
-        import time
-
-        storage_dir = temp_dir / "storage"
-        project_dir = temp_dir / "project"
-        storage_dir.mkdir()
-        project_dir.mkdir()
-
-        monkeypatch.setenv("CLAUDE_MEMORY_STORAGE", str(storage_dir))
-        monkeypatch.setenv("CLAUDE_MEMORY_PROJECT", str(project_dir))
-
-        import importlib
-        import claude_memory.config
-        importlib.reload(claude_memory.config)
-        import claude_memory.parser
-        importlib.reload(claude_memory.parser)
-        import claude_memory.chunker
-        importlib.reload(claude_memory.chunker)
-        from claude_memory.chunker import sync_chunks, load_all_chunks
-        from claude_memory.config import ensure_dirs
+        project_dir = fresh_chunker.project_dir
 
-        ensure_dirs()
+        from claude_memory.chunker import sync_chunks, load_all_chunks
 
         # Create a test conversation
         conv_file = project_dir / "test-session.jsonl"
@@ -238,7 +242,6 @@ class TestSyncChunks:
         sync_chunks()
 
         # Modify the file (add another exchange)
-        time.sleep(0.01)  # Ensure mtime changes
         extended_data = sample_conversation_data + [
             {"type": "user", "uuid": "u2", "timestamp": "2025-01-15T10:01:00Z",
              "sessionId": "test-session", "message": {"role": "user", "content": "Follow up"}},
@@ -247,6 +250,10 @@ class TestSyncChunks:
              "content": [{"type": "text", "text": "Response"}]}},
         ]
         write_jsonl(conv_file, extended_data)
+        # Move the mtime forward explicitly rather than sleeping, so the
+        # change is seen even on filesystems with coarse timestamps
+        stat = conv_file.stat()
+        os.utime(conv_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000_000))
 
         # Second sync - should detect new chunk
         new_chunks, _ = sync_chunks()
@@ -256,106 +263,242 @@ class TestSyncChunks:
         chunks = load_all_chunks()
         assert len(chunks) == 2
 
+    def test_sync_many_files_in_parallel(self, fresh_chunker, sample_conversation_data):
+        """Syncing enough files to use the process pool still writes every chunk once."""
+        project_dir = fresh_chunker.project_dir
 
-class TestLoadAllChunks:
-    """Tests for load_all_chunks function."""
+        from claude_memory.chunker import PARALLEL_MIN_FILES, sync_chunks, load_all_chunks
+
+        num_files = PARALLEL_MIN_FILES + 2
+        for i in range(num_files):
+            data = [dict(item, uuid=f"{item['uuid']}-{i}") for item in sample_conversation_data]
+            write_jsonl(project_dir / f"session-{i}.jsonl", data)
+
+        new_chunks, new_files = sync_chunks()
+
+        assert new_chunks == num_files
+        assert new_files == num_files
+        assert {c.session_id for c in load_all_chunks()} == {f"session-{i}" for i in range(num_files)}
+
+    def test_sync_honors_legacy_processed_mtimes(self, fresh_chunker, sample_conversation_data):
+        """Files recorded with the old str(st_mtime) format are not reprocessed."""
+        project_dir = fresh_chunker.project_dir
+
+        from claude_memory.chunker import sync_chunks
+        from claude_memory.config import PROCESSED_FILE
+
+        conv_file = project_dir / "test-session.jsonl"
+        write_jsonl(conv_file, sample_conversation_data)
+        PROCESSED_FILE.write_text(json.dumps({conv_file.name: str(conv_file.stat().st_mtime)}))
+
+        new_chunks, new_files = sync_chunks()
+        assert new_chunks == 0
+        assert new_files == 0
+
+    def test_sync_persists_chunk_index(self, fresh_chunker, sample_conversation_data):
+        """Sync saves a fingerprint index that goes stale when chunk files change."""
+        storage_dir = fresh_chunker.storage_dir
+        project_dir = fresh_chunker.project_dir
+
+        from claude_memory.chunker import (
+            load_chunk_index,
+            load_existing_chunk_fingerprints,
+            sync_chunks,
+        )
+        from claude_memory.config import CHUNKS_FILE
+
+        write_jsonl(project_dir / "test-session.jsonl", sample_conversation_data)
+        sync_chunks()
+
+        assert load_chunk_index() == load_existing_chunk_fingerprints()
+
+        # Another machine's chunks arriving (e.g. git pull) invalidates it
+        (storage_dir / "chunks-other.jsonl").write_text(json.dumps({"id": "x"}) + "\n")
+        assert load_chunk_index() is None
+
+        # Next sync rebuilds it
+        sync_chunks()
+        assert load_chunk_index() == load_existing_chunk_fingerprints()
+        assert CHUNKS_FILE.exists()
+
+    def test_count_chunks_matches_loaded_chunks(self, fresh_chunker, sample_conversation_data):
+        """count_chunks agrees with load_all_chunks with and without a current index."""
+        storage_dir = fresh_chunker.storage_dir
+        project_dir = fresh_chunker.project_dir
 
-    def test_load_empty(self, temp_dir, monkeypatch):
-        """Loading from nonexistent file returns empty list."""
-        storage_dir = temp_dir / "storage"
-        storage_dir.mkdir()
+        from claude_memory.chunker import count_chunks, load_all_chunks, sync_chunks
 
-        monkeypatch.setenv("CLAUDE_MEMORY_STORAGE", str(storage_dir))
+        write_jsonl(project_dir / "test-session.jsonl", sample_conversation_data)
+        sync_chunks()
+        assert count_chunks() == len(load_all_chunks()) > 0
+
+        # Duplicate of an existing chunk plus a new one from another machine
+        existing_id = load_all_chunks()[0].id
+        with open(storage_dir / "chunks-other.jsonl", "w") as f:
+            for chunk_id in (existing_id, "other-1"):
+                f.write(json.dumps({
+                    "id": chunk_id,
+                    "text": "User: Hi\n\nAssistant: Hello",
+                    "timestamp": "2025-01-15T10:00:00Z",
+                    "session_id": "other",
+                }) + "\n")
+        assert count_chunks() == len(load_all_chunks())
 
-        import importlib
-        import claude_memory.config
-        importlib.reload(claude_memory.config)
-        import claude_memory.chunker
-        importlib.reload(claude_memory.chunker)
+
+class TestLoadAllChunks:
+    """Tests for load_all_chunks function."""
+
+    @pytest.mark.parametrize("rows,expected_texts", [
+        # Nonexistent file
+        (None, {}),
+        # Single chunk
+        ([("chunk-1", "User: Hi\n\nAssistant: Hello")], {"chunk-1": "Hello"}),
+        # Duplicate IDs (simulating a git merge conflict): last occurrence wins
+        (
+            [
+                ("chunk-1", "User: Hi\n\nAssistant: Hello v1"),
+                ("chunk-2", "User: Bye\n\nAssistant: Goodbye"),
+                ("chunk-1", "User: Hi\n\nAssistant: Hello v2"),
+            ],
+            {"chunk-1": "Hello v2", "chunk-2": "Goodbye"},
+        ),
+    ], ids=["empty", "single", "duplicates"])
+    def test_load(self, fresh_chunker, rows, expected_texts):
+        """Load chunks from the chunks file, keeping the last occurrence of each ID."""
         from claude_memory.chunker import load_all_chunks
+        from claude_memory.config import CHUNKS_FILE
+
+        if rows is not None:
+            write_jsonl(CHUNKS_FILE, [
+                {"id": chunk_id, "text": text, "timestamp": "2025-01-15T10:00:00Z", "session_id": "test"}
+                for chunk_id, text in rows
+            ])
 
         chunks = load_all_chunks()
-        assert chunks == []
 
-    def test_load_existing_chunks(self, temp_dir, monkeypatch):
-        """Load chunks from existing file."""
-        storage_dir = temp_dir / "storage"
-        storage_dir.mkdir()
+        assert sorted(c.id for c in chunks) == sorted(expected_texts)
+        for chunk in chunks:
+            assert expected_texts[chunk.id] in chunk.text
 
-        monkeypatch.setenv("CLAUDE_MEMORY_STORAGE", str(storage_dir))
+    def test_load_deduplicates_across_files(self, fresh_chunker):
+        """Duplicates across chunk files keep the occurrence from the later file."""
+        storage_dir = fresh_chunker.storage_dir
 
-        import importlib
-        import claude_memory.config
-        importlib.reload(claude_memory.config)
-        import claude_memory.chunker
-        importlib.reload(claude_memory.chunker)
         from claude_memory.chunker import load_all_chunks
-        from claude_memory.config import CHUNKS_FILE, ensure_dirs
-
-        ensure_dirs()
 
-        # Write some chunks
-        with open(CHUNKS_FILE, "w") as f:
-            f.write(json.dumps({
-                "id": "chunk-1",
-                "text": "User: Hi\n\nAssistant: Hello",
+        def chunk_line(chunk_id, text):
+            return json.dumps({
+                "id": chunk_id,
+                "text": text,
                 "timestamp": "2025-01-15T10:00:00Z",
                 "session_id": "test",
-            }) + "\n")
+            }) + "\n"
+
+        # Legacy file is read before machine-specific files
+        (storage_dir / "chunks.jsonl").write_text(
+            chunk_line("chunk-1", "old") + chunk_line("chunk-2", "only")
+        )
+        (storage_dir / "chunks-other.jsonl").write_text(chunk_line("chunk-1", "new"))
 
         chunks = load_all_chunks()
-        assert len(chunks) == 1
-        assert chunks[0].id == "chunk-1"
 
-    def test_load_deduplicates_by_id(self, temp_dir, monkeypatch):
-        """Load deduplicates chunks with same ID, keeping last occurrence."""
-        storage_dir = temp_dir / "storage"
-        storage_dir.mkdir()
+        assert [c.id for c in chunks] == ["chunk-1", "chunk-2"]
+        assert chunks[0].text == "new"
 
-        monkeypatch.setenv("CLAUDE_MEMORY_STORAGE", str(storage_dir))
+    def test_load_falls_back_when_last_occurrence_malformed(self, fresh_chunker):
+        """A malformed later line for an ID doesn't hide an earlier valid one."""
+        storage_dir = fresh_chunker.storage_dir
 
-        import importlib
-        import claude_memory.config
-        importlib.reload(claude_memory.config)
-        import claude_memory.chunker
-        importlib.reload(claude_memory.chunker)
         from claude_memory.chunker import load_all_chunks
-        from claude_memory.config import CHUNKS_FILE, ensure_dirs
 
-        ensure_dirs()
-
-        # Write chunks with duplicate IDs (simulating git merge conflict)
-        with open(CHUNKS_FILE, "w") as f:
-            # First occurrence
-            f.write(json.dumps({
-                "id": "chunk-1",
-                "text": "User: Hi\n\nAssistant: Hello v1",
-                "timestamp": "2025-01-15T10:00:00Z",
-                "session_id": "test",
-            }) + "\n")
-            # Unique chunk
-            f.write(json.dumps({
-                "id": "chunk-2",
-                "text": "User: Bye\n\nAssistant: Goodbye",
-                "timestamp": "2025-01-15T10:01:00Z",
-                "session_id": "test",
-            }) + "\n")
-            # Duplicate of chunk-1 (should replace first)
-            f.write(json.dumps({
-                "id": "chunk-1",
-                "text": "User: Hi\n\nAssistant: Hello v2",
-                "timestamp": "2025-01-15T10:00:00Z",
-                "session_id": "test",
-            }) + "\n")
+        valid = json.dumps({
+            "id": "chunk-1",
+            "text": "valid",
+            "timestamp": "2025-01-15T10:00:00Z",
+            "session_id": "test",
+        })
+        (storage_dir / "chunks.jsonl").write_text(
+            valid + "\n"
+            + '{"id": "chunk-1", "timestamp": "2025-01-15T11:00:00Z"}\n'  # no text
+            + '{"id": "chunk-1", "text": "trunc\n'  # truncated append
+        )
 
         chunks = load_all_chunks()
 
-        # Should have 2 unique chunks
-        assert len(chunks) == 2
+        assert [c.text for c in chunks] == ["valid"]
+
+    def test_iter_excludes_ids(self, fresh_chunker):
+        """iter_all_chunks skips excluded IDs, including duplicated ones."""
+        storage_dir = fresh_chunker.storage_dir
+
+        from claude_memory.chunker import iter_all_chunks
+
+        with open(storage_dir / "chunks.jsonl", "w") as f:
+            for chunk_id in ("chunk-1", "chunk-2", "chunk-1", "chunk-3"):
+                f.write(json.dumps({
+                    "id": chunk_id,
+                    "text": "text",
+                    "timestamp": "2025-01-15T10:00:00Z",
+                    "session_id": "test",
+                }) + "\n")
+
+        chunks = list(iter_all_chunks(exclude={"chunk-1", "chunk-3"}))
 
-        # chunk-1 should have the last version (v2)
-        chunk_1 = next(c for c in chunks if c.id == "chunk-1")
-        assert "Hello v2" in chunk_1.text
+        assert [c.id for c in chunks] == ["chunk-2"]
+
+
+class TestIterChunkLines:
+    """Tests for iter_chunk_lines function."""
+
+    def test_empty_file(self, temp_dir):
+        """Empty files yield nothing (mmap can't map them)."""
+        from claude_memory.chunker import iter_chunk_lines
+
+        path = temp_dir / "chunks.jsonl"
+        path.touch()
+        assert list(iter_chunk_lines(path)) == []
+
+    def test_skips_blank_lines_and_handles_missing_newline(self, temp_dir):
+        """Blank lines are skipped and a final unterminated line is kept."""
+        from claude_memory.chunker import iter_chunk_lines
+
+        path = temp_dir / "chunks.jsonl"
+        path.write_bytes(b'{"id": "a"}\n\n{"id": "b"}')
+        assert list(iter_chunk_lines(path)) == [b'{"id": "a"}', b'{"id": "b"}']
+
+
+class TestLoadExistingChunkIds:
+    """Tests for load_existing_chunk_ids function."""
+
+    def test_loads_ids_from_all_formats(self, fresh_chunker):
+        """IDs are read from compact, spaced, and escaped JSON lines."""
+        from claude_memory.chunker import load_existing_chunk_ids
+        from claude_memory.config import CHUNKS_FILE
+
+        with open(CHUNKS_FILE, "w") as f:
+            f.write(json.dumps({"id": "chunk-1", "text": 'say "id": "fake"'}) + "\n")
+            f.write(json.dumps({"text": "x", "id": "chunk-2"}, separators=(",", ":")) + "\n")
+            f.write(json.dumps({"id": 'odd\\"id', "text": "x"}) + "\n")
+            f.write("not json\n")
+
+        assert load_existing_chunk_ids() == {"chunk-1", "chunk-2", 'odd\\"id'}
+
+    def test_fingerprints_match_ids(self, fresh_chunker):
+        """Fingerprints are computed from the same IDs as load_existing_chunk_ids."""
+        from claude_memory.chunker import (
+            chunk_fingerprint,
+            load_existing_chunk_fingerprints,
+            load_existing_chunk_ids,
+        )
+        from claude_memory.config import CHUNKS_FILE
+
+        with open(CHUNKS_FILE, "w") as f:
+            f.write(json.dumps({"id": "chunk-1", "text": "x"}) + "\n")
+            f.write(json.dumps({"id": "chunk-\u00e9", "text": "x"}) + "\n")
+
+        expected = {chunk_fingerprint(i.encode("utf-8")) for i in load_existing_chunk_ids()}
+        assert load_existing_chunk_fingerprints() == expected
+        assert len(expected) == 2
 
 
 class TestRecursiveSplit:
@@ -428,6 +571,24 @@ class TestRecursiveSplit:
         for part in parts[:-1]:
             assert len(part) <= MAX_CHUNK_CHARS
 
+    def test_empty_text(self):
+        """Empty text produces no parts."""
+        from claude_memory.chunker import recursive_split
+
+        assert recursive_split("") == []
+
+    def test_oversized_part_does_not_duplicate_previous(self):
+        """Text before an oversized part should appear in only one chunk."""
+        from claude_memory.chunker import recursive_split, MAX_CHUNK_CHARS
+
+        before = "A" * 100
+        after = "B" * 100
+        long_text = f"{before}\n\n{'X' * (MAX_CHUNK_CHARS + 500)}\n\n{after}"
+
+        parts = recursive_split(long_text)
+        assert sum(before in part for part in parts) == 1
+        assert parts[-1] == after
+
 
 class TestAddOverlap:
     """Tests for add_overlap function."""
@@ -452,6 +613,13 @@ class TestAddOverlap:
         # Second should start with end of first
         assert result[1].startswith(chunks[0][-OVERLAP_CHARS:])
 
+    def test_short_previous_chunk_not_repeated(self):
+        """A previous chunk shorter than the overlap isn't prepended whole."""
+        from claude_memory.chunker import add_overlap
+
+        chunks = ["Short", "Next chunk"]
+        assert add_overlap(chunks) == chunks
+
     def test_empty_list(self):
         """Empty list should return empty."""
         from claude_memory.chunker import add_overlap
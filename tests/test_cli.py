@@ -1,10 +1,12 @@
 """Tests for the CLI module."""
 
-import json
+import shutil
 
 import pytest
 from click.testing import CliRunner
 
+from conftest import sample_conversation, write_jsonl
+
 
 def reload_all_modules(monkeypatch, storage_dir, project_dir=None):
     """Helper to reload all modules with new paths."""
@@ -31,21 +33,49 @@ def reload_all_modules(monkeypatch, storage_dir, project_dir=None):
     return cli
 
 
+@pytest.fixture(scope="module")
+def runner():
+    """Create a CLI runner (it holds no state between invocations)."""
+    return CliRunner()
+
+
+@pytest.fixture(scope="session")
+def prebuilt_storage(tmp_path_factory):
+    """Storage and project dirs with the sample conversation synced.
+
+    Syncing embeds chunks, so it is done once per session; use synced_cli
+    to get a private copy.
+    """
+    base = tmp_path_factory.mktemp("prebuilt")
+    storage_dir = base / "storage"
+    project_dir = base / "project"
+    project_dir.mkdir()
+    write_jsonl(project_dir / "test-session.jsonl", sample_conversation())
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        cli = reload_all_modules(monkeypatch, storage_dir, project_dir)
+        result = CliRunner().invoke(cli, ["sync", "-q", "--no-summaries"])
+    assert result.exit_code == 0, result.output
+    return storage_dir, project_dir
+
+
+@pytest.fixture
+def synced_cli(prebuilt_storage, temp_dir, monkeypatch):
+    """The CLI pointed at a fresh copy of the prebuilt, synced storage."""
+    storage_dir = temp_dir / "storage"
+    project_dir = temp_dir / "project"
+    shutil.copytree(prebuilt_storage[0], storage_dir)
+    shutil.copytree(prebuilt_storage[1], project_dir)
+    return reload_all_modules(monkeypatch, storage_dir, project_dir)
+
+
 class TestCLI:
     """Tests for CLI commands."""
 
-    @pytest.fixture
-    def runner(self):
-        """Create a CLI runner."""
-        return CliRunner()
-
     def test_sync_command(self, temp_dir, sample_conversation_data, runner, monkeypatch):
         """Test sync command."""
-        from conftest import write_jsonl
-
         storage_dir = temp_dir / "storage"
         project_dir = temp_dir / "project"
-        storage_dir.mkdir()
         project_dir.mkdir()
 
         cli = reload_all_modules(monkeypatch, storage_dir, project_dir)
@@ -62,11 +92,8 @@ class TestCLI:
 
     def test_sync_quiet_mode(self, temp_dir, sample_conversation_data, runner, monkeypatch):
         """Test sync command with quiet flag."""
-        from conftest import write_jsonl
-
         storage_dir = temp_dir / "storage"
         project_dir = temp_dir / "project"
-        storage_dir.mkdir()
         project_dir.mkdir()
 
         cli = reload_all_modules(monkeypatch, storage_dir, project_dir)
@@ -82,7 +109,6 @@ class TestCLI:
     def test_search_no_index(self, temp_dir, runner, monkeypatch):
         """Search with no index should show helpful message."""
         storage_dir = temp_dir / "storage"
-        storage_dir.mkdir()
 
         cli = reload_all_modules(monkeypatch, storage_dir)
 
@@ -91,75 +117,30 @@ class TestCLI:
         assert result.exit_code == 0
         assert "sync" in result.output.lower()
 
-    def test_search_with_data(self, temp_dir, sample_conversation_data, runner, monkeypatch):
-        """Search should return results after sync."""
-        from conftest import write_jsonl
-
-        storage_dir = temp_dir / "storage"
-        project_dir = temp_dir / "project"
-        storage_dir.mkdir()
-        project_dir.mkdir()
-
-        cli = reload_all_modules(monkeypatch, storage_dir, project_dir)
-
-        conv_file = project_dir / "test-session.jsonl"
-        write_jsonl(conv_file, sample_conversation_data)
-
-        # First sync to index
-        runner.invoke(cli, ["sync", "-q"])
-
-        # Then search
-        result = runner.invoke(cli, ["search", "Hello"])
-
-        assert result.exit_code == 0
+    @pytest.mark.parametrize("argv,expected", [
         # Should have results or "no results"
-        assert "Result" in result.output or "No results" in result.output
-
-    def test_search_num_results(self, temp_dir, sample_conversation_data, runner, monkeypatch):
-        """Search with -n flag should limit results."""
-        from conftest import write_jsonl
-
-        storage_dir = temp_dir / "storage"
-        project_dir = temp_dir / "project"
-        storage_dir.mkdir()
-        project_dir.mkdir()
-
-        cli = reload_all_modules(monkeypatch, storage_dir, project_dir)
-
-        conv_file = project_dir / "test-session.jsonl"
-        write_jsonl(conv_file, sample_conversation_data)
-
-        runner.invoke(cli, ["sync", "-q"])
-
-        result = runner.invoke(cli, ["search", "-n", "1", "Hello"])
+        (["search", "Hello"], "result"),
+        (["stats"], "chunk"),
+        (["rebuild"], "index"),
+    ], ids=["search", "stats", "rebuild"])
+    def test_command_after_sync(self, synced_cli, runner, argv, expected):
+        """Commands run against a synced index."""
+        result = runner.invoke(synced_cli, argv)
 
         assert result.exit_code == 0
+        assert expected in result.output.lower()
 
-    def test_stats_command(self, temp_dir, sample_conversation_data, runner, monkeypatch):
-        """Test stats command."""
-        from conftest import write_jsonl
-
-        storage_dir = temp_dir / "storage"
-        project_dir = temp_dir / "project"
-        storage_dir.mkdir()
-        project_dir.mkdir()
-
-        cli = reload_all_modules(monkeypatch, storage_dir, project_dir)
-
-        conv_file = project_dir / "test-session.jsonl"
-        write_jsonl(conv_file, sample_conversation_data)
-
-        runner.invoke(cli, ["sync", "-q"])
-
-        result = runner.invoke(cli, ["stats"])
+    def test_search_num_results(self, synced_cli, runner):
+        """Search with -n prints at most that many results."""
+        result = runner.invoke(synced_cli, ["search", "-n", "1", "Hello"])
 
         assert result.exit_code == 0
-        assert "chunk" in result.output.lower()
+        assert "Result 1 " in result.output
+        assert "Result 2 " not in result.output
 
     def test_stats_empty(self, temp_dir, runner, monkeypatch):
         """Stats on empty index should work."""
         storage_dir = temp_dir / "storage"
-        storage_dir.mkdir()
 
         cli = reload_all_modules(monkeypatch, storage_dir)
 
@@ -168,33 +149,10 @@ class TestCLI:
         assert result.exit_code == 0
         assert "0" in result.output
 
-    def test_rebuild_command(self, temp_dir, sample_conversation_data, runner, monkeypatch):
-        """Test rebuild command."""
-        from conftest import write_jsonl
-
-        storage_dir = temp_dir / "storage"
-        project_dir = temp_dir / "project"
-        storage_dir.mkdir()
-        project_dir.mkdir()
-
-        cli = reload_all_modules(monkeypatch, storage_dir, project_dir)
-
-        conv_file = project_dir / "test-session.jsonl"
-        write_jsonl(conv_file, sample_conversation_data)
-
-        # First sync to create chunks
-        runner.invoke(cli, ["sync", "-q"])
-
-        result = runner.invoke(cli, ["rebuild"])
-
-        assert result.exit_code == 0
-        assert "rebuild" in result.output.lower() or "index" in result.output.lower()
-
     def test_config_command(self, temp_dir, runner, monkeypatch):
         """Test config command."""
         storage_dir = temp_dir / "storage"
         project_dir = temp_dir / "project"
-        storage_dir.mkdir()
         project_dir.mkdir()
 
         cli = reload_all_modules(monkeypatch, storage_dir, project_dir)
@@ -208,14 +166,22 @@ class TestCLI:
         assert str(project_dir) in result.output
         assert str(storage_dir) in result.output
 
+    def test_config_with_invalid_insert_batch(self, temp_dir, runner, monkeypatch):
+        """A malformed CLAUDE_MEMORY_INSERT_BATCH doesn't break the CLI."""
+        monkeypatch.setenv("CLAUDE_MEMORY_INSERT_BATCH", "1k")
+
+        cli = reload_all_modules(monkeypatch, temp_dir / "storage")
+
+        result = runner.invoke(cli, ["config"])
+
+        assert result.exit_code == 0
+        from claude_memory.config import INSERT_BATCH_SIZE
+        assert INSERT_BATCH_SIZE == 1000
+
 
 class TestCLIHelp:
     """Tests for CLI help messages."""
 
-    @pytest.fixture
-    def runner(self):
-        return CliRunner()
-
     def test_main_help(self, runner):
         """Main command should have help."""
         from claude_memory.cli import cli
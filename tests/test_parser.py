@@ -7,6 +7,7 @@ from claude_memory.parser import (
     extract_text_content,
     extract_tool_calls,
     extract_tool_results,
+    extract_message_parts,
     extract_files_from_tool_calls,
     extract_commands_from_tool_calls,
     parse_conversation,
@@ -142,6 +143,21 @@ class TestParseConversation:
         assert len(messages) == 1
         assert messages[0].content == "Valid line"
 
+    def test_invalid_utf8_line_skipped(self, temp_dir):
+        """A line with invalid UTF-8 is skipped without losing the rest of the file."""
+        filepath = temp_dir / "bad-encoding.jsonl"
+        filepath.write_bytes(
+            b'{"type":"user","uuid":"u0","message":{"role":"user","content":"bad \xff"}}\n'
+            + (
+                '{"type":"user","uuid":"u1","timestamp":"2025-01-15T10:00:00Z",'
+                '"message":{"role":"user","content":"Caf\u00e9 \u2713"}}\n'
+            ).encode("utf-8")
+        )
+
+        messages = list(parse_conversation(filepath))
+        assert len(messages) == 1
+        assert messages[0].content == "Café ✓"
+
     def test_parse_long_conversation(self, long_conversation):
         """Parse a longer conversation with multiple exchanges."""
         messages = list(parse_conversation(long_conversation))
@@ -272,6 +288,36 @@ class TestExtractToolResults:
         assert results[0].content == "First part\nSecond part"
 
 
+class TestExtractMessageParts:
+    """Tests for extract_message_parts function."""
+
+    MIXED = {
+        "message": {
+            "content": [
+                {"type": "text", "text": "Let me check."},
+                {"type": "tool_use", "id": "t1", "name": "Read", "input": {"file_path": "/a.py"}},
+                {"type": "tool_result", "tool_use_id": "t0", "content": "ok"},
+                "not a block",
+                {"type": "text", "text": "Done."},
+            ]
+        }
+    }
+
+    @pytest.mark.parametrize("role", ["user", "assistant"])
+    def test_matches_separate_extractors(self, role):
+        """One pass gives the same parts as the individual extractors."""
+        text, tool_calls, tool_results = extract_message_parts(self.MIXED, role)
+
+        assert text == extract_text_content(self.MIXED)
+        assert tool_calls == (extract_tool_calls(self.MIXED) if role == "assistant" else [])
+        assert tool_results == (extract_tool_results(self.MIXED) if role == "user" else [])
+
+    def test_string_and_missing_content(self):
+        """String content is the text; missing content gives nothing."""
+        assert extract_message_parts({"message": {"content": "Hi"}}, "user") == ("Hi", [], [])
+        assert extract_message_parts({"message": {}}, "user") == (None, [], [])
+
+
 class TestExtractFilesFromToolCalls:
     """Tests for extract_files_from_tool_calls function."""
 
@@ -337,6 +383,46 @@ class TestExtractCommandsFromToolCalls:
         assert commands == ["echo hi"]
 
 
+class TestMessageToolMetadata:
+    """Tests for the tool metadata properties on Message."""
+
+    def test_tool_metadata_strings(self):
+        """Tool names are deduped and sorted, commands capped at five."""
+        tool_calls = [
+            ToolCall(name="Read", input={"file_path": "/src/main.py"}, id="t1"),
+            ToolCall(name="Bash", input={"command": "ls"}, id="t2"),
+        ] + [
+            ToolCall(name="Bash", input={"command": f"echo {i}"}, id=f"b{i}")
+            for i in range(6)
+        ]
+        msg = Message(
+            role="assistant",
+            content="Done",
+            uuid="a1",
+            timestamp="2025-01-15T10:00:00Z",
+            session_id="test",
+            tool_calls=tool_calls,
+        )
+
+        assert msg.tools_used == "Bash,Read"
+        assert msg.files_touched == "/src/main.py"
+        assert msg.commands_run == "ls,echo 0,echo 1,echo 2,echo 3"
+
+    def test_no_tool_calls(self):
+        """Messages without tool calls have empty metadata."""
+        msg = Message(
+            role="assistant",
+            content="Hi",
+            uuid="a1",
+            timestamp="2025-01-15T10:00:00Z",
+            session_id="test",
+        )
+
+        assert msg.tools_used == ""
+        assert msg.files_touched == ""
+        assert msg.commands_run == ""
+
+
 class TestParseConversationWithTools:
     """Tests for parsing conversations with tool metadata."""
 
@@ -378,3 +464,56 @@ class TestGetContextAround:
         """Nonexistent session returns empty list."""
         result = get_context_around("nonexistent-session", "2025-01-01T00:00:00Z", n=2)
         assert result == []
+
+    def test_context_window_and_reparse_on_change(self, fresh_chunker):
+        """Context is sliced around the match and reflects later file changes."""
+        import json
+        import os
+
+        from claude_memory.parser import get_context_around
+
+        def line(i):
+            role = "user" if i % 2 == 0 else "assistant"
+            content = f"message {i}" if role == "user" else [{"type": "text", "text": f"message {i}"}]
+            return json.dumps({
+                "type": role,
+                "uuid": f"m{i}",
+                "timestamp": f"2025-01-15T10:00:{i:02d}Z",
+                "message": {"role": role, "content": content},
+            }) + "\n"
+
+        filepath = fresh_chunker.project_dir / "session-1.jsonl"
+        filepath.write_text("".join(line(i) for i in range(6)))
+
+        result = get_context_around("session-1", "2025-01-15T10:00:02Z", n=1)
+        assert [m.content for m in result] == ["message 1", "message 2", "message 3"]
+
+        # Appending a message (with a newer mtime) is picked up
+        with open(filepath, "a") as f:
+            f.write(line(6))
+        stat = filepath.stat()
+        os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        result = get_context_around("session-1", "2025-01-15T10:00:06Z", n=1)
+        assert [m.content for m in result] == ["message 5", "message 6"]
+
+    def test_out_of_order_timestamps(self, fresh_chunker):
+        """Matching still works when timestamps aren't in file order."""
+        import json
+
+        from claude_memory.parser import get_context_around
+
+        timestamps = ["2025-01-15T10:00:05Z", "2025-01-15T10:00:01Z", "2025-01-15T10:00:03Z"]
+        filepath = fresh_chunker.project_dir / "session-2.jsonl"
+        filepath.write_text("".join(
+            json.dumps({
+                "type": "user",
+                "uuid": f"m{i}",
+                "timestamp": ts,
+                "message": {"role": "user", "content": f"message {i}"},
+            }) + "\n"
+            for i, ts in enumerate(timestamps)
+        ))
+
+        result = get_context_around("session-2", "2025-01-15T10:00:01Z", n=0)
+        assert [m.content for m in result] == ["message 1"]
@@ -1,82 +1,73 @@
 """Tests for the store module."""
 
 import json
+import sqlite3
 
 import pytest
 
+from conftest import reload_store_modules, write_jsonl
 
-def reload_modules(monkeypatch, storage_dir):
-    """Helper to reload config and store modules with new paths."""
-    monkeypatch.setenv("CLAUDE_MEMORY_STORAGE", str(storage_dir))
 
-    import importlib
-    import claude_memory.config
-    importlib.reload(claude_memory.config)
-    import claude_memory.chunker
-    importlib.reload(claude_memory.chunker)
-    import claude_memory.store
-    importlib.reload(claude_memory.store)
+# Three single-turn chunks on distinct topics
+SAMPLE_CHUNKS = [
+    {"id": "chunk-1", "text": "User: How do I use Python?\n\nAssistant: Python is great for scripting.",
+     "timestamp": "2025-01-15T10:00:00Z", "session_id": "session-1"},
+    {"id": "chunk-2", "text": "User: What about JavaScript?\n\nAssistant: JavaScript runs in browsers.",
+     "timestamp": "2025-01-15T11:00:00Z", "session_id": "session-2"},
+    {"id": "chunk-3", "text": "User: Database recommendations?\n\nAssistant: PostgreSQL is reliable.",
+     "timestamp": "2025-01-15T12:00:00Z", "session_id": "session-3"},
+]
 
-    from claude_memory.store import Store
-    from claude_memory.config import CHUNKS_FILE, ensure_dirs
 
-    ensure_dirs()
-    return Store, CHUNKS_FILE
+@pytest.fixture(scope="module")
+def built_store(tmp_path_factory):
+    """A Store indexed over three chunks, built once per module.
+
+    Only for tests that don't modify the store.
+    """
+    storage_dir = tmp_path_factory.mktemp("built") / "storage"
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        Store, CHUNKS_FILE = reload_store_modules(monkeypatch, storage_dir)
+        write_jsonl(CHUNKS_FILE, SAMPLE_CHUNKS)
+        store = Store()
+        # Also opens the text index while the storage dir is still set
+        store.rebuild_index()
+    yield store
+    store.close()
 
 
 class TestStore:
     """Tests for the Store class."""
 
-    def test_empty_store_count(self, temp_dir, monkeypatch):
-        """New store should have zero chunks."""
-        storage_dir = temp_dir / "storage"
-        storage_dir.mkdir()
+    def test_empty_store_count(self, tmp_storage):
+        """New storage reports zero chunks, without loading the embedding model."""
+        from claude_memory.store import get_indexed_count
 
-        Store, _ = reload_modules(monkeypatch, storage_dir)
-        store = Store()
-        assert store.count() == 0
+        assert get_indexed_count() == 0
 
-    def test_rebuild_index(self, temp_dir, monkeypatch):
+    def test_rebuild_index(self, tmp_storage):
         """Rebuilding index should add all chunks."""
-        storage_dir = temp_dir / "storage"
-        storage_dir.mkdir()
-
-        Store, CHUNKS_FILE = reload_modules(monkeypatch, storage_dir)
-
-        # Write test chunks
-        chunks = [
-            {"id": "chunk-1", "text": "User: How do I use Python?\n\nAssistant: Python is great.",
-             "timestamp": "2025-01-15T10:00:00Z", "session_id": "session-1"},
-            {"id": "chunk-2", "text": "User: What about JavaScript?\n\nAssistant: JavaScript runs in browsers.",
-             "timestamp": "2025-01-15T11:00:00Z", "session_id": "session-2"},
-            {"id": "chunk-3", "text": "User: Database recommendations?\n\nAssistant: PostgreSQL is reliable.",
-             "timestamp": "2025-01-15T12:00:00Z", "session_id": "session-3"},
-        ]
+        Store, CHUNKS_FILE = tmp_storage
 
-        with open(CHUNKS_FILE, "w") as f:
-            for chunk in chunks:
-                f.write(json.dumps(chunk) + "\n")
+        write_jsonl(CHUNKS_FILE, SAMPLE_CHUNKS)
 
         store = Store()
         indexed = store.rebuild_index()
         assert indexed == 3
         assert store.count() == 3
 
-    def test_rebuild_index_incremental(self, temp_dir, monkeypatch):
+    def test_rebuild_index_incremental(self, tmp_storage):
         """Rebuilding should only add new chunks."""
-        storage_dir = temp_dir / "storage"
-        storage_dir.mkdir()
-
-        Store, CHUNKS_FILE = reload_modules(monkeypatch, storage_dir)
+        Store, CHUNKS_FILE = tmp_storage
 
         # Write initial chunk
-        with open(CHUNKS_FILE, "w") as f:
-            f.write(json.dumps({
-                "id": "chunk-1",
-                "text": "User: Hi\n\nAssistant: Hello",
-                "timestamp": "2025-01-15T10:00:00Z",
-                "session_id": "test",
-            }) + "\n")
+        write_jsonl(CHUNKS_FILE, [{
+            "id": "chunk-1",
+            "text": "User: Hi\n\nAssistant: Hello",
+            "timestamp": "2025-01-15T10:00:00Z",
+            "session_id": "test",
+        }])
 
         store = Store()
         indexed = store.rebuild_index()
@@ -97,55 +88,19 @@ class TestStore:
         assert indexed == 1
         assert store.count() == 2
 
-    def test_search_returns_results(self, temp_dir, monkeypatch):
+    def test_search_returns_results(self, built_store):
         """Search should return relevant results."""
-        storage_dir = temp_dir / "storage"
-        storage_dir.mkdir()
-
-        Store, CHUNKS_FILE = reload_modules(monkeypatch, storage_dir)
-
-        # Write test chunks
-        chunks = [
-            {"id": "chunk-1", "text": "User: How do I use Python?\n\nAssistant: Python is great for scripting.",
-             "timestamp": "2025-01-15T10:00:00Z", "session_id": "session-1"},
-            {"id": "chunk-2", "text": "User: What about JavaScript?\n\nAssistant: JavaScript runs in browsers.",
-             "timestamp": "2025-01-15T11:00:00Z", "session_id": "session-2"},
-        ]
-
-        with open(CHUNKS_FILE, "w") as f:
-            for chunk in chunks:
-                f.write(json.dumps(chunk) + "\n")
-
-        store = Store()
-        store.rebuild_index()
-
-        results = store.search("Python programming", n=3)
+        results = built_store.search("Python programming", n=3)
 
         assert len(results) > 0
         texts = [r.text for r in results]
         assert any("Python" in t for t in texts)
 
-    def test_search_result_fields(self, temp_dir, monkeypatch):
+    def test_search_result_fields(self, built_store):
         """Search results should have all required fields."""
-        storage_dir = temp_dir / "storage"
-        storage_dir.mkdir()
-
-        Store, CHUNKS_FILE = reload_modules(monkeypatch, storage_dir)
-
-        with open(CHUNKS_FILE, "w") as f:
-            f.write(json.dumps({
-                "id": "chunk-1",
-                "text": "User: Database recommendations?\n\nAssistant: PostgreSQL is reliable.",
-                "timestamp": "2025-01-15T12:00:00Z",
-                "session_id": "session-3",
-            }) + "\n")
-
-        store = Store()
-        store.rebuild_index()
-
         from claude_memory.store import SearchResult
 
-        results = store.search("database", n=1)
+        results = built_store.search("database", n=1)
 
         assert len(results) == 1
         result = results[0]
@@ -155,33 +110,16 @@ class TestStore:
         assert result.timestamp
         assert isinstance(result.distance, float)
 
-    def test_search_empty_store(self, temp_dir, monkeypatch):
-        """Searching empty store returns empty list."""
-        storage_dir = temp_dir / "storage"
-        storage_dir.mkdir()
-
-        Store, _ = reload_modules(monkeypatch, storage_dir)
-        store = Store()
-
-        results = store.search("anything")
-        assert results == []
-
-    def test_search_limits_results(self, temp_dir, monkeypatch):
+    def test_search_limits_results(self, tmp_storage):
         """Search should respect n parameter."""
-        storage_dir = temp_dir / "storage"
-        storage_dir.mkdir()
+        Store, CHUNKS_FILE = tmp_storage
 
-        Store, CHUNKS_FILE = reload_modules(monkeypatch, storage_dir)
-
-        # Write 3 chunks
-        for i in range(3):
-            with open(CHUNKS_FILE, "a") as f:
-                f.write(json.dumps({
-                    "id": f"chunk-{i}",
-                    "text": f"User: Question {i}?\n\nAssistant: Answer {i}.",
-                    "timestamp": f"2025-01-15T{10+i}:00:00Z",
-                    "session_id": "test",
-                }) + "\n")
+        write_jsonl(CHUNKS_FILE, [{
+            "id": f"chunk-{i}",
+            "text": f"User: Question {i}?\n\nAssistant: Answer {i}.",
+            "timestamp": f"2025-01-15T{10 + i}:00:00Z",
+            "session_id": "test",
+        } for i in range(12)])
 
         store = Store()
         store.rebuild_index()
@@ -189,23 +127,19 @@ class TestStore:
         results = store.search("question", n=1)
         assert len(results) == 1
 
-        results = store.search("question", n=10)
-        assert len(results) == 3  # Only 3 chunks exist
+        results = store.search("question", n=5)
+        assert len(results) == 5
 
-    def test_clear(self, temp_dir, monkeypatch):
+    def test_clear(self, tmp_storage):
         """Clear should remove all data."""
-        storage_dir = temp_dir / "storage"
-        storage_dir.mkdir()
+        Store, CHUNKS_FILE = tmp_storage
 
-        Store, CHUNKS_FILE = reload_modules(monkeypatch, storage_dir)
-
-        with open(CHUNKS_FILE, "w") as f:
-            f.write(json.dumps({
-                "id": "chunk-1",
-                "text": "User: Hi\n\nAssistant: Hello",
-                "timestamp": "2025-01-15T10:00:00Z",
-                "session_id": "test",
-            }) + "\n")
+        write_jsonl(CHUNKS_FILE, [{
+            "id": "chunk-1",
+            "text": "User: Hi\n\nAssistant: Hello",
+            "timestamp": "2025-01-15T10:00:00Z",
+            "session_id": "test",
+        }])
 
         store = Store()
         store.rebuild_index()
@@ -214,20 +148,16 @@ class TestStore:
         store.clear()
         assert store.count() == 0
 
-    def test_search_after_clear(self, temp_dir, monkeypatch):
+    def test_search_after_clear(self, tmp_storage):
         """Search after clear should return empty."""
-        storage_dir = temp_dir / "storage"
-        storage_dir.mkdir()
-
-        Store, CHUNKS_FILE = reload_modules(monkeypatch, storage_dir)
+        Store, CHUNKS_FILE = tmp_storage
 
-        with open(CHUNKS_FILE, "w") as f:
-            f.write(json.dumps({
-                "id": "chunk-1",
-                "text": "User: Python question\n\nAssistant: Python answer",
-                "timestamp": "2025-01-15T10:00:00Z",
-                "session_id": "test",
-            }) + "\n")
+        write_jsonl(CHUNKS_FILE, [{
+            "id": "chunk-1",
+            "text": "User: Python question\n\nAssistant: Python answer",
+            "timestamp": "2025-01-15T10:00:00Z",
+            "session_id": "test",
+        }])
 
         store = Store()
         store.rebuild_index()
@@ -235,3 +165,211 @@ class TestStore:
 
         results = store.search("Python")
         assert results == []
+
+
+class FakeCollection:
+    """Stands in for a ChromaDB collection with canned query results."""
+
+    def __init__(self, rows):
+        self._rows = rows  # (chunk_id, distance, metadata) in query order
+
+    def count(self):
+        return len(self._rows)
+
+    def query(self, query_texts, n_results, include):
+        rows = self._rows[:n_results]
+        per_query = len(query_texts)
+        return {
+            "ids": [[r[0] for r in rows]] * per_query,
+            "documents": [[r[2]["text"] for r in rows]] * per_query,
+            "metadatas": [[dict(r[2]) for r in rows] for _ in range(per_query)],
+            "distances": [[r[1] for r in rows]] * per_query,
+        }
+
+    def get(self, include):
+        return {"ids": [r[0] for r in self._rows]}
+
+    def add(self, ids, documents, metadatas):
+        for chunk_id, text, metadata in zip(ids, documents, metadatas):
+            self._rows.append((chunk_id, 0.0, {**metadata, "text": text}))
+
+
+@pytest.fixture
+def fake_store(tmp_storage):
+    """Build Stores around a fake collection, without loading the embedding model.
+
+    Call it with the collection (and optionally a client). The stores are
+    closed on teardown.
+    """
+    Store, _ = tmp_storage
+    stores = []
+
+    def make(collection, client=None):
+        store = Store.__new__(Store)
+        store._client = client
+        store._collection = collection
+        store._text_index = None
+        store._executor = None
+        store._count = None
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        # Tests may swap in a stub index without close()
+        if not hasattr(store._text_index, "close"):
+            store._text_index = None
+        store.close()
+
+
+class TestRebuildIndex:
+    """Tests for Store.rebuild_index, without loading the embedding model."""
+
+    def test_rebuild_also_fills_text_index(self, tmp_storage, fake_store):
+        """New chunks are added to the keyword index alongside the vectors."""
+        _, CHUNKS_FILE = tmp_storage
+
+        write_jsonl(CHUNKS_FILE, [{
+            "id": f"chunk-{i}",
+            "text": f"User: Question {i}?\n\nAssistant: Answer {i}.",
+            "timestamp": f"2025-01-15T{10+i}:00:00Z",
+            "session_id": "test",
+        } for i in range(3)])
+
+        store = fake_store(FakeCollection([("chunk-0", 0.0, {"text": "old"})]))
+
+        assert store.count() == 1
+        assert store.rebuild_index(batch_size=1) == 2
+        assert store._text_index.get_indexed_ids() == {"chunk-1", "chunk-2"}
+        # The cached count is refreshed after new chunks are added
+        assert store.count() == 3
+
+    def test_rebuild_survives_text_index_errors(self, tmp_storage, fake_store):
+        """A failing keyword index doesn't stop the vector rebuild."""
+        _, CHUNKS_FILE = tmp_storage
+
+        write_jsonl(CHUNKS_FILE, SAMPLE_CHUNKS)
+
+        class LockedTextIndex:
+            def add_batch(self, chunks):
+                raise sqlite3.OperationalError("database is locked")
+
+        store = fake_store(FakeCollection([]))
+        store._text_index = LockedTextIndex()
+
+        assert store.rebuild_index(batch_size=1) == 3
+        assert store.count() == 3
+
+    def test_batch_size_capped_by_client(self, tmp_storage, fake_store):
+        """Batches never exceed the client's max batch size."""
+        _, CHUNKS_FILE = tmp_storage
+
+        write_jsonl(CHUNKS_FILE, [{
+            "id": f"chunk-{i}",
+            "text": f"Chunk {i}",
+            "timestamp": f"2025-01-15T{10+i}:00:00Z",
+            "session_id": "test",
+        } for i in range(5)])
+
+        class FakeClient:
+            def get_max_batch_size(self):
+                return 2
+
+        batch_sizes = []
+
+        class RecordingCollection(FakeCollection):
+            def add(self, ids, documents, metadatas):
+                batch_sizes.append(len(ids))
+                super().add(ids, documents, metadatas)
+
+        store = fake_store(RecordingCollection([]), client=FakeClient())
+
+        assert store.rebuild_index(batch_size=1000) == 5
+        assert batch_sizes == [2, 2, 1]
+
+
+class TestSearchRanking:
+    """Tests for Store.search ranking, without loading the embedding model."""
+
+    def test_search_empty_store(self, fake_store):
+        """Searching empty store returns empty list."""
+        store = fake_store(FakeCollection([]))
+
+        assert store.search("anything") == []
+        assert store.search_many(["a", "b"]) == [[], []]
+
+    def test_results_ordered_by_score(self, fake_store):
+        """Results come back best score first, not in id order."""
+        rows = [
+            ("c-far", 0.9, {"text": "far", "session_id": "s"}),
+            ("a-mid", 0.5, {"text": "mid", "session_id": "s"}),
+            ("b-near", 0.1, {"text": "near", "session_id": "s"}),
+        ]
+        store = fake_store(FakeCollection(rows))
+
+        for dedupe in (True, False):
+            results = store.search("q", n=3, dedupe_splits=dedupe, hybrid=False)
+            assert [r.text for r in results] == ["near", "mid", "far"]
+
+    def test_dedupe_keeps_best_split_per_turn(self, fake_store):
+        """Only the best-scoring split of a turn is returned."""
+        rows = [
+            ("t1-0", 0.1, {"text": "t1 part 0", "parent_turn_id": "t1"}),
+            ("t1-1", 0.2, {"text": "t1 part 1", "parent_turn_id": "t1"}),
+            ("t2", 0.3, {"text": "t2"}),
+            ("t3", 0.4, {"text": "t3"}),
+        ]
+        store = fake_store(FakeCollection(rows))
+
+        results = store.search("q", n=2, hybrid=False)
+        assert [r.text for r in results] == ["t1 part 0", "t2"]
+
+    def test_hybrid_merges_keyword_results(self, fake_store):
+        """Keyword matches boost vector hits and add keyword-only results."""
+        from claude_memory.text_index import TextSearchResult
+
+        rows = [
+            ("v1", 0.2, {"text": "vector best"}),
+            ("both", 0.4, {"text": "in both"}),
+        ]
+        store = fake_store(FakeCollection(rows))
+
+        class FakeTextIndex:
+            def search(self, query, n):
+                return [
+                    TextSearchResult("both", "in both", -5.0, "s", "t"),
+                    TextSearchResult("kw", "keyword only", -1.0, "s", "t"),
+                ]
+
+        store._text_index = FakeTextIndex()
+
+        results = store.search("q", n=5)
+        # "both": 0.7 * 1.0 + 0.3 * 0.0 = 0.7; "v1": 0.5; "kw": 0.5 + 0.3 * 1.0 = 0.8
+        assert [r.text for r in results] == ["vector best", "in both", "keyword only"]
+
+    def test_search_many_matches_single_searches(self, fake_store):
+        """search_many returns what separate searches would, per query."""
+        rows = [
+            ("a", 0.3, {"text": "a"}),
+            ("b", 0.1, {"text": "b"}),
+        ]
+        store = fake_store(FakeCollection(rows))
+
+        many = store.search_many(["q1", "q2"], n=2, hybrid=False)
+
+        assert len(many) == 2
+        for results in many:
+            assert [r.text for r in results] == [r.text for r in store.search("q", n=2, hybrid=False)]
+        assert store.search_many([], n=2) == []
+
+    def test_searches_reuse_one_worker(self, fake_store):
+        """The vector search worker is started once and shut down by close."""
+        store = fake_store(FakeCollection([("a", 0.1, {"text": "a"})]))
+
+        store.search("q1", hybrid=False)
+        executor = store._executor
+        store.search("q2", hybrid=False)
+        assert store._executor is executor
+
+        store.close()
+        assert store._executor is None
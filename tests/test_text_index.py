@@ -1,16 +1,20 @@
 """Tests for the text_index module (BM25 keyword search)."""
 
+import sqlite3
+
 import pytest
-from pathlib import Path
 
 from claude_memory.text_index import TextIndex
 
 
 @pytest.fixture
-def text_index(temp_dir):
-    """Create a temporary text index for testing."""
-    db_path = temp_dir / "test_text_index.db"
-    index = TextIndex(db_path=db_path)
+def text_index():
+    """Create an in-memory text index for testing.
+
+    The on-disk path is covered by test_context_manager and
+    test_data_visible_after_reopen.
+    """
+    index = TextIndex(db_path=":memory:")
     yield index
     index.close()
 
@@ -61,10 +65,43 @@ class TestTextIndex:
         assert added == 1  # Only chunk-2 was added
         assert text_index.count() == 2
 
+    def test_add_batch_duplicate_in_batch(self, text_index):
+        """A chunk ID repeated within one batch is indexed once."""
+        chunk = ("chunk-1", "JWT tokens", "session-1", "2025-01-15T10:00:00Z")
+        added = text_index.add_batch([chunk, chunk])
+        assert added == 1
+        assert [r.chunk_id for r in text_index.search("JWT")] == ["chunk-1"]
+
+    def test_add_batch_failure_leaves_nothing_staged(self, text_index):
+        """A failed batch adds nothing, and its rows don't leak into the next."""
+        with pytest.raises(sqlite3.ProgrammingError):
+            text_index.add_batch([
+                ("chunk-1", "First text", "session-1", "2025-01-15T10:00:00Z"),
+                ("chunk-2", "Missing fields"),
+            ])
+
+        text_index.add_batch([("chunk-3", "Third text", "session-3", "2025-01-15T12:00:00Z")])
+        assert text_index.get_indexed_ids() == {"chunk-3"}
+
+    def test_add_batch_from_generator(self, text_index, monkeypatch):
+        """Batch add consumes a generator across several insert windows."""
+        import claude_memory.text_index
+
+        monkeypatch.setattr(claude_memory.text_index, "ADD_BATCH_SIZE", 2)
+        text_index.add("chunk-0", "Already here", "session-0", "2025-01-15T10:00:00Z")
+
+        added = text_index.add_batch(
+            (f"chunk-{i}", f"Text {i}", "session-1", "2025-01-15T10:00:00Z") for i in range(5)
+        )
+        assert added == 4
+        assert text_index.count() == 5
+
     def test_search_finds_exact_match(self, text_index):
         """Search finds documents with exact keyword match."""
-        text_index.add("chunk-1", "JWT authentication tokens", "session-1", "2025-01-15T10:00:00Z")
-        text_index.add("chunk-2", "Database migrations", "session-2", "2025-01-15T11:00:00Z")
+        text_index.add_batch([
+            ("chunk-1", "JWT authentication tokens", "session-1", "2025-01-15T10:00:00Z"),
+            ("chunk-2", "Database migrations", "session-2", "2025-01-15T11:00:00Z"),
+        ])
 
         results = text_index.search("JWT")
         assert len(results) == 1
@@ -81,8 +118,10 @@ class TestTextIndex:
 
     def test_search_returns_bm25_scores(self, text_index):
         """Search results include BM25 scores."""
-        text_index.add("chunk-1", "authentication", "session-1", "2025-01-15T10:00:00Z")
-        text_index.add("chunk-2", "authentication authentication authentication", "session-2", "2025-01-15T11:00:00Z")
+        text_index.add_batch([
+            ("chunk-1", "authentication", "session-1", "2025-01-15T10:00:00Z"),
+            ("chunk-2", "authentication authentication authentication", "session-2", "2025-01-15T11:00:00Z"),
+        ])
 
         results = text_index.search("authentication")
         assert len(results) == 2
@@ -147,25 +186,48 @@ class TestTextIndex:
             index.add("chunk-1", "test", "session-1", "2025-01-15T10:00:00Z")
             assert index.count() == 1
 
+    def test_data_visible_after_reopen(self, temp_dir):
+        """Committed chunks persist across connections in WAL mode."""
+        db_path = temp_dir / "wal_test.db"
 
-class TestTextIndexQueryParsing:
-    """Tests for query parsing and FTS5 syntax."""
+        with TextIndex(db_path=db_path) as index:
+            index.add_batch([("chunk-1", "test", "session-1", "2025-01-15T10:00:00Z")])
+            journal_mode = index._conn.execute("PRAGMA journal_mode").fetchone()[0]
 
-    def test_multi_word_query_uses_or(self, text_index):
-        """Multi-word queries use OR by default (find any word)."""
-        text_index.add("chunk-1", "authentication system", "session-1", "2025-01-15T10:00:00Z")
-        text_index.add("chunk-2", "database connection", "session-2", "2025-01-15T11:00:00Z")
+        assert journal_mode == "wal"
+        with TextIndex(db_path=db_path) as index:
+            assert index.get_indexed_ids() == {"chunk-1"}
 
-        # "auth database" should find both (OR logic with prefix)
-        results = text_index.search("auth database")
-        assert len(results) == 2
 
-    def test_quoted_phrase_search(self, text_index):
-        """Quoted phrases search for exact phrase."""
-        text_index.add("chunk-1", "user authentication flow", "session-1", "2025-01-15T10:00:00Z")
-        text_index.add("chunk-2", "authentication for user", "session-2", "2025-01-15T11:00:00Z")
+class TestTextIndexQueryParsing:
+    """Tests for query parsing and FTS5 syntax."""
+
+    @pytest.mark.parametrize("query,expected_ids", [
+        # Multi-word queries use OR by default (find any word), with prefixes
+        ("auth database", {"chunk-1", "chunk-2", "chunk-3"}),
+        # Quoted phrases search for the exact phrase
+        ('"user authentication"', {"chunk-1"}),
+    ], ids=["multi-word-or", "quoted-phrase"])
+    def test_query_matches(self, text_index, query, expected_ids):
+        """Queries match the expected chunks."""
+        text_index.add_batch([
+            ("chunk-1", "user authentication flow", "session-1", "2025-01-15T10:00:00Z"),
+            ("chunk-2", "authentication for user", "session-2", "2025-01-15T11:00:00Z"),
+            ("chunk-3", "database connection", "session-3", "2025-01-15T12:00:00Z"),
+        ])
 
-        # Exact phrase match
-        results = text_index.search('"user authentication"')
-        assert len(results) == 1
-        assert results[0].chunk_id == "chunk-1"
+        results = text_index.search(query)
+        assert {r.chunk_id for r in results} == expected_ids
+
+    @pytest.mark.parametrize("query,passthrough", [
+        ("auth AND bug", True),
+        ("auth and bug", True),
+        ("auth not bug", True),
+        ('"exact phrase"', True),
+        ("android notes", False),
+        ("ORM", False),
+    ])
+    def test_operator_detection(self, text_index, query, passthrough):
+        """Queries with FTS5 operators pass through; others get prefix terms."""
+        prepared = text_index._prepare_query(query)
+        assert (prepared == query) is passthrough